@@ -12,6 +12,8 @@ class Settings(BaseSettings):
     # External service URLs
     file_organizer_url: str = "http://file-organizer:8005"
     ocr_service_url: str = "http://ocr-service:8006"
+    # Send OCR requests as references to the shared uploads volume instead of re-uploading files
+    ocr_by_reference: bool = True
     
     # Processing configuration
     default_language: str = "eng"
@@ -50,7 +50,7 @@ class DocumentProcessor:
             logger.debug(f"[{job_id or 'N/A'}] Updated status to 'processing'")
 
             # Perform OCR
-            ocr_result = await self._perform_ocr(file_id, language)
+            ocr_result = await self._perform_ocr(file_id, language, file_metadata)
             logger.debug(f"[{job_id or 'N/A'}] OCR result received")
 
             # Calculate processing time
@@ -123,9 +123,26 @@ class DocumentProcessor:
             )
             response.raise_for_status()
 
-    async def _perform_ocr(self, file_id: str, language: str) -> Dict:
+    async def _perform_ocr(self, file_id: str, language: str, file_metadata: Optional[Dict] = None) -> Dict:
         """Perform OCR on the document using OCR service"""
         async with httpx.AsyncClient() as client:
+            if self.settings.ocr_by_reference and file_metadata and file_metadata.get("filename"):
+                # Both services mount the uploads volume, so let the OCR service read the file in place
+                ocr_response = await client.post(
+                    f"{self.ocr_service_url}/extract",
+                    data={
+                        "file_path": file_metadata["filename"],
+                        "file_hash": file_metadata.get("file_hash"),
+                        "language": language,
+                        "file_id": file_id
+                    },
+                    timeout=300.0
+                )
+                if ocr_response.status_code != 404:
+                    ocr_response.raise_for_status()
+                    return ocr_response.json()
+                logger.warning(f"File {file_id} not on the shared volume, uploading it to the OCR service")
+
             # Download file from file organizer
             file_response = await client.get(
                 f"{self.file_organizer_url}/files/{file_id}/download",
@@ -134,8 +151,9 @@ class DocumentProcessor:
             file_response.raise_for_status()
 
             # Prepare file for OCR service
+            filename = (file_metadata or {}).get("original_filename") or "document"
             files = {
-                "file": ("document", file_response.content, file_response.headers.get("content-type"))
+                "file": (filename, file_response.content, file_response.headers.get("content-type"))
             }
             data = {
                 "language": language,
@@ -0,0 +1,212 @@
+# admission.py
+import asyncio
+import collections
+import logging
+import math
+import time
+from typing import Dict, Iterable, Optional
+from starlette.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Bounds the requests and request bytes being processed at once.
+
+    Requests over the limits wait in FIFO order, up to ``max_waiting`` of
+    them for at most ``max_wait`` seconds; beyond that they are rejected
+    with a Retry-After estimated from the moving average request time. A
+    request larger than ``max_bytes`` is still admitted when nothing else is
+    in flight. Limits of 0 are unlimited.
+    """
+
+    def __init__(self, max_requests: int = 0, max_bytes: int = 0, max_waiting: int = 0,
+                 max_wait: float = 0.0, max_retry_after: int = 120, alpha: float = 0.2):
+        self.max_requests = max_requests
+        self.max_bytes = max_bytes
+        self.max_waiting = max_waiting
+        self.max_wait = max_wait
+        self.max_retry_after = max_retry_after
+        self.alpha = alpha
+        self.in_flight = 0
+        self.in_flight_bytes = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.seconds_per_request = None
+        self._waiters = collections.deque()
+
+    def _fits(self, cost: int) -> bool:
+        if self.max_requests and self.in_flight >= self.max_requests:
+            return False
+        if self.max_bytes and self.in_flight and self.in_flight_bytes + cost > self.max_bytes:
+            return False
+        return True
+
+    def _take(self, cost: int):
+        self.in_flight += 1
+        self.in_flight_bytes += cost
+        self.admitted += 1
+
+    def _wake(self):
+        while self._waiters and self._fits(self._waiters[0][0]):
+            cost, future = self._waiters.popleft()
+            if future.done():
+                continue
+            self._take(cost)
+            future.set_result(None)
+
+    async def acquire(self, cost: int):
+        if not self._waiters and self._fits(cost):
+            self._take(cost)
+            return
+        if len(self._waiters) >= self.max_waiting:
+            self._reject("Server busy: too many requests waiting")
+
+        entry = (cost, asyncio.get_event_loop().create_future())
+        self._waiters.append(entry)
+        try:
+            await asyncio.wait_for(entry[1], self.max_wait or None)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if entry in self._waiters:
+                self._waiters.remove(entry)
+            elif entry[1].done() and not entry[1].cancelled():
+                # Admitted just as the wait ended; hand the slot back
+                self.release(cost)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self._reject("Server busy: timed out waiting for capacity")
+
+    def release(self, cost: int, elapsed: Optional[float] = None):
+        self.in_flight -= 1
+        self.in_flight_bytes -= cost
+        if elapsed is not None:
+            if self.seconds_per_request is None:
+                self.seconds_per_request = elapsed
+            else:
+                self.seconds_per_request += self.alpha * (elapsed - self.seconds_per_request)
+        self._wake()
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog should have drained"""
+        per_request = self.seconds_per_request or 1.0
+        concurrency = self.max_requests or max(1, self.in_flight)
+        backlog = self.in_flight + len(self._waiters) + 1
+        return min(self.max_retry_after, max(1, math.ceil(per_request * backlog / concurrency)))
+
+    def _reject(self, message: str):
+        self.rejected += 1
+        raise AdmissionRejected(message, self.retry_after())
+
+    def stats(self) -> Dict:
+        return {
+            "in_flight": self.in_flight,
+            "in_flight_bytes": self.in_flight_bytes,
+            "waiting": len(self._waiters),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "seconds_per_request": round(self.seconds_per_request, 3) if self.seconds_per_request is not None else None,
+            "max_requests": self.max_requests,
+            "max_bytes": self.max_bytes,
+            "max_waiting": self.max_waiting
+        }
+
+
+class QueueDepthGuard:
+    """Rejects new jobs while the job queue is at ``max_depth``.
+
+    The drain rate is measured from successive depth observations (net of
+    jobs enqueued in between), and gives the Retry-After for rejections.
+    """
+
+    def __init__(self, max_depth: int = 0, max_retry_after: int = 120, alpha: float = 0.3):
+        self.max_depth = max_depth
+        self.max_retry_after = max_retry_after
+        self.alpha = alpha
+        self.rejected = 0
+        self.jobs_per_second = None
+        self._last = None
+        self._enqueued = 0
+
+    def observe(self, depth: int):
+        now = time.monotonic()
+        if self._last is not None:
+            last_time, last_depth = self._last
+            elapsed = now - last_time
+            if elapsed < 1.0:
+                return
+            rate = max(0.0, last_depth + self._enqueued - depth) / elapsed
+            if self.jobs_per_second is None:
+                self.jobs_per_second = rate
+            else:
+                self.jobs_per_second += self.alpha * (rate - self.jobs_per_second)
+        self._last = (now, depth)
+        self._enqueued = 0
+
+    def check(self, depth: int):
+        """Raise AdmissionRejected if a job can't be added at this depth"""
+        self.observe(depth)
+        if self.max_depth and depth >= self.max_depth:
+            self.rejected += 1
+            excess = depth - self.max_depth + 1
+            seconds = excess / self.jobs_per_second if self.jobs_per_second else self.max_retry_after
+            raise AdmissionRejected(
+                f"Queue full: {depth} jobs waiting",
+                min(self.max_retry_after, max(1, math.ceil(seconds)))
+            )
+
+    def enqueued(self):
+        self._enqueued += 1
+
+    def stats(self) -> Dict:
+        return {
+            "max_depth": self.max_depth,
+            "rejected": self.rejected,
+            "jobs_per_second": round(self.jobs_per_second, 3) if self.jobs_per_second is not None else None
+        }
+
+
+class AdmissionMiddleware:
+    """ASGI middleware that admits POSTs to ``paths`` through an AdmissionController.
+
+    Admission happens before the body is read, costed by Content-Length, and
+    the slot is held until the response (including a streamed one) is sent.
+    """
+
+    def __init__(self, app, controller: AdmissionController, paths: Iterable[str]):
+        self.app = app
+        self.controller = controller
+        self.paths = set(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        try:
+            cost = int(headers.get(b"content-length", b"0"))
+        except ValueError:
+            cost = 0
+
+        try:
+            await self.controller.acquire(cost)
+        except AdmissionRejected as e:
+            logger.warning(f"Rejected {scope['path']}: {str(e)}")
+            response = JSONResponse(
+                {"detail": str(e)}, status_code=429,
+                headers={"Retry-After": str(e.retry_after)}
+            )
+            await response(scope, receive, send)
+            return
+
+        start_time = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(cost, time.monotonic() - start_time)
@@ -1,21 +1,38 @@
 # app.py
 from fastapi import FastAPI, File, UploadFile, HTTPException, Form
 from fastapi.middleware.cors import CORSMiddleware
-import pytesseract
+from fastapi.responses import StreamingResponse, Response
 import logging
 import io
+import json
 import sys
 import os
+import time
+import asyncio
+from typing import List
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 
 from config import Settings
-from shared.models import OCRRequest, OCRResult, HealthResponse
+from shared.models import OCRRequest, OCRResult, HealthResponse, FormResult
 from ocr_processor import OCRProcessor
+from utils import shutdown_pools, run_in_threadpool
+from spool import spool_stream, spool_bytes, remove_spooled, sweep_spool, SpoolLimitExceeded
+from lanes import LANES, count_pages, choose_lane
+from regions import parse_page_spec, parse_regions
+from progress import describe_progress, read_partial
+from admission import AdmissionController, AdmissionMiddleware, AdmissionRejected, QueueDepthGuard
 from redis import Redis
-from rq import Queue
-from tasks import run_ocr_job
+from rq import Queue, Retry
+from rq.job import Job
+from rq.exceptions import NoSuchJobError
+from tasks import run_ocr_job, run_ocr_batch_job
 import uuid
 
+try:
+    import msgpack # type: ignore
+except ImportError:
+    msgpack = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -26,6 +43,23 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Initialize settings and processor
+settings = Settings()
+
+# Admission control; added before CORS so rejections still carry CORS headers
+admission = AdmissionController(
+    max_requests=settings.admission_max_requests,
+    max_bytes=settings.admission_max_mb * 1024 * 1024,
+    max_waiting=settings.admission_max_waiting,
+    max_wait=settings.admission_max_wait,
+    max_retry_after=settings.admission_max_retry_after
+)
+app.add_middleware(
+    AdmissionMiddleware,
+    controller=admission,
+    paths=["/extract", "/extract/stream", "/extract/batch", "/extract/form"]
+)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -35,88 +69,387 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize settings and processor
-settings = Settings()
 processor = OCRProcessor(settings)
 
+async def _sweep_spool_periodically():
+    """Expire spooled uploads whose jobs never ran (e.g. the queue was flushed)"""
+    max_age = settings.spool_ttl_hours * 3600
+    while True:
+        try:
+            await run_in_threadpool(sweep_spool, settings.spool_dir, max_age)
+        except Exception as e:
+            logger.warning(f"Spool sweep failed: {str(e)}")
+        await asyncio.sleep(min(max_age, 3600))
+
+# Engine capabilities, cached by the startup warm-up so health checks never run tesseract
+engine_state = {"ready": False, "error": None, "capabilities": None}
+
+async def _warm_up():
+    try:
+        capabilities = await processor.start_up(
+            settings.startup_warm_languages or None, warm=settings.startup_warm_up
+        )
+    except Exception as e:
+        engine_state["error"] = str(e)
+        logger.error(f"OCR engine start-up failed: {str(e)}")
+        return
+    engine_state["capabilities"] = capabilities
+    engine_state["ready"] = True
+    logger.info(
+        f"OCR engine ready in {capabilities['startup_seconds']}s: "
+        f"tesseract {capabilities['tesseract_version']}, warmed {capabilities['warmed']}"
+    )
+
+@app.on_event("startup")
+async def startup_event():
+    asyncio.ensure_future(_sweep_spool_periodically())
+    asyncio.ensure_future(_warm_up())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    shutdown_pools()
+    logger.info("OCR worker pools shut down")
+
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
-    """Health check with Tesseract info"""
-    try:
-        tesseract_version = pytesseract.get_tesseract_version()
+    """Health check with Tesseract info, served from the start-up cache"""
+    capabilities = engine_state["capabilities"]
+    if capabilities is not None:
         return HealthResponse(
             status="healthy",
-            tesseract_version=str(tesseract_version),
-            supported_languages=pytesseract.get_languages(config='')
+            tesseract_version=capabilities["tesseract_version"],
+            supported_languages=capabilities["languages"]
         )
-    except Exception as e:
-        logger.error(f"Health check failed: {str(e)}")
-        return HealthResponse(
-            status="degraded",
-            tesseract_version="unknown",
-            supported_languages=[]
+    return HealthResponse(
+        status="degraded" if engine_state["error"] else "starting",
+        tesseract_version="unknown",
+        supported_languages=[]
+    )
+
+@app.get("/health/live")
+async def liveness():
+    """The process is up and serving requests"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness():
+    """The engine has started and its workers are warm"""
+    if not engine_state["ready"]:
+        raise HTTPException(status_code=503, detail=engine_state["error"] or "Warming up")
+    capabilities = engine_state["capabilities"]
+    return {
+        "status": "ready",
+        "engine": capabilities["engine"],
+        "tesseract_version": capabilities["tesseract_version"],
+        "warmed": capabilities["warmed"]
+    }
+
+
+def _validate_upload(filename: str, file_content: bytes):
+    """Validate size and type of an uploaded file"""
+    _validate_size(len(file_content))
+    _validate_filename(filename)
+
+
+def _validate_size(file_size: int):
+    if file_size > settings.max_file_size:
+        raise HTTPException(
+            status_code=413, 
+            detail=f"File too large. Max size: {settings.max_file_size} bytes"
+        )
+
+
+def _validate_filename(filename: str):
+    # Validate file type
+    if not filename:
+        raise HTTPException(status_code=400, detail="Filename required")
+    
+    allowed_extensions = ['pdf', 'jpg', 'jpeg', 'png', 'tiff', 'tif', 'bmp']
+    file_ext = filename.lower().split('.')[-1]
+    if file_ext not in allowed_extensions:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Unsupported file type. Allowed: {allowed_extensions}"
         )
 
 
+RESULT_FORMATS = ["objects", "columnar", "msgpack"]
+
+def _validate_result_format(result_format: str):
+    """Validate the requested result encoding"""
+    if result_format not in RESULT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported result format. Allowed: {RESULT_FORMATS}")
+    if result_format == "msgpack" and msgpack is None:
+        raise HTTPException(status_code=400, detail="msgpack output is not available on this server")
+
+
+def _format_event(data: dict, stream_format: str) -> str:
+    """Encode a streaming event as an NDJSON line or an SSE message"""
+    payload = json.dumps(data)
+    if stream_format == "sse":
+        return f"event: {data['event']}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+
+def _page_event(page: dict, result_format: str = "objects") -> dict:
+    event = {
+        "event": "page",
+        "page": page["page"],
+        "text": page["text"],
+        "confidence": page["confidence"],
+        "info": page["info"]
+    }
+    if result_format == "objects":
+        event["text_blocks"] = [block.model_dump() for block in page["words"].to_text_blocks()]
+    else:
+        event["words"] = page["words"].to_dict()
+    return event
+
+
+def _summary_event(result: OCRResult) -> dict:
+    return {
+        "event": "summary",
+        "file_id": result.file_id,
+        "total_pages": result.total_pages,
+        "language": result.language,
+        "overall_confidence": result.overall_confidence,
+        "processing_time": result.processing_time,
+        "time_to_first_page": result.metadata.get("time_to_first_page"),
+        "metadata": result.metadata,
+        "timestamp": result.timestamp
+    }
+
+
+def _resolve_upload_path(path: str) -> str:
+    """Absolute path of a file on the shared uploads volume, refusing paths that escape it"""
+    root = os.path.realpath(settings.upload_dir)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise HTTPException(status_code=400, detail=f"Path outside upload directory: {path}")
+    return resolved
+
+
 @app.post("/extract", response_model=OCRResult)
 async def extract_text(
-    file: UploadFile = File(...),
+    file: UploadFile = File(None),
+    file_path: str = Form(None),
+    file_hash: str = Form(None),
     language: str = Form("eng"),
     file_id: str = Form(None),
-    confidence_threshold: float = Form(30.0)
+    confidence_threshold: float = Form(30.0),
+    preprocessing: str = Form(None),
+    dpi_mode: str = Form(None),
+    min_dpi: int = Form(None),
+    max_dpi: int = Form(None),
+    result_format: str = Form("objects"),
+    pages: str = Form(None),
+    regions: str = Form(None),
+    region_units: str = Form("pixels")
 ):
-    """Extract text from uploaded file"""
+    """Extract text from uploaded file.
+
+    result_format "columnar" or "msgpack" returns words as parallel arrays
+    (CompactOCRResult) instead of one object per word. ``pages`` selects
+    pages ("1-3,7") and ``regions`` is a JSON list of [x, y, width, height]
+    boxes, in pixels at the reference DPI or "normalized" to the page size,
+    to OCR instead of whole pages; boxes come back in page coordinates.
+
+    Instead of uploading, services sharing the uploads volume can pass
+    ``file_path`` (relative to the volume, optionally with the SHA-256
+    ``file_hash``); the file is then read in place without being copied.
+    """
     try:
-        # Validate file size
-        file_content = await file.read()
-        if len(file_content) > settings.max_file_size:
-            raise HTTPException(
-                status_code=413, 
-                detail=f"File too large. Max size: {settings.max_file_size} bytes"
-            )
-        
-        # Validate file type
-        if not file.filename:
-            raise HTTPException(status_code=400, detail="Filename required")
-        
-        allowed_extensions = ['pdf', 'jpg', 'jpeg', 'png', 'tiff', 'tif', 'bmp']
-        file_ext = file.filename.lower().split('.')[-1]
-        if file_ext not in allowed_extensions:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Unsupported file type. Allowed: {allowed_extensions}"
-            )
+        _validate_result_format(result_format)
+        if (file is None) == (file_path is None):
+            raise HTTPException(status_code=400, detail="Provide either file or file_path")
+
+        if file is not None:
+            filename = file.filename
+            file_content = await file.read()
+            _validate_upload(filename, file_content)
+        else:
+            file_content = None
+            file_path = _resolve_upload_path(file_path)
+            filename = os.path.basename(file_path)
+            _validate_filename(filename)
+            if not os.path.isfile(file_path):
+                raise HTTPException(status_code=404, detail="File not found")
+            _validate_size(os.path.getsize(file_path))
         
         # Process file
         result = await processor.process_file(
             file_content=file_content,
-            filename=file.filename,
+            filename=filename,
             language=language,
             file_id=file_id,
-            confidence_threshold=confidence_threshold
+            confidence_threshold=confidence_threshold,
+            preprocessing=preprocessing,
+            dpi_mode=dpi_mode,
+            min_dpi=min_dpi,
+            max_dpi=max_dpi,
+            compact=result_format != "objects",
+            pages=pages,
+            regions=regions,
+            region_units=region_units,
+            file_path=file_path,
+            file_hash=file_hash
         )
         
-        logger.info(f"Successfully processed file: {file.filename}")
+        logger.info(f"Successfully processed file: {filename}")
+        if result_format == "columnar":
+            return Response(content=result.model_dump_json(), media_type="application/json")
+        if result_format == "msgpack":
+            return Response(content=msgpack.packb(result.model_dump()), media_type="application/x-msgpack")
         return result
         
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"OCR extraction failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/extract/stream")
+async def extract_text_stream(
+    file: UploadFile = File(...),
+    language: str = Form("eng"),
+    file_id: str = Form(None),
+    confidence_threshold: float = Form(30.0),
+    preprocessing: str = Form(None),
+    dpi_mode: str = Form(None),
+    min_dpi: int = Form(None),
+    max_dpi: int = Form(None),
+    stream_format: str = Form("ndjson"),
+    result_format: str = Form("objects"),
+    pages: str = Form(None),
+    regions: str = Form(None),
+    region_units: str = Form("pixels")
+):
+    """Extract text, streaming each page as NDJSON or SSE as soon as it is done"""
+    if stream_format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="stream_format must be 'ndjson' or 'sse'")
+    if result_format not in ("objects", "columnar"):
+        raise HTTPException(status_code=400, detail="result_format must be 'objects' or 'columnar'")
+
+    try:
+        file_content = await file.read()
+        _validate_upload(file.filename, file_content)
+
+        events = processor.iter_file(
+            file_content=file_content,
+            filename=file.filename,
+            language=language,
+            file_id=file_id,
+            confidence_threshold=confidence_threshold,
+            preprocessing=preprocessing,
+            dpi_mode=dpi_mode,
+            min_dpi=min_dpi,
+            max_dpi=max_dpi,
+            compact=True,
+            pages=pages,
+            regions=regions,
+            region_units=region_units
+        )
+        # Wait for the first page so setup errors still get a proper status code
+        first_event = await events.__anext__()
+
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"OCR extraction failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def event_stream():
+        event, payload = first_event
+        try:
+            while True:
+                if event == "page":
+                    yield _format_event(_page_event(payload, result_format), stream_format)
+                else:
+                    yield _format_event(_summary_event(payload), stream_format)
+                    logger.info(f"Successfully streamed file: {file.filename}")
+                event, payload = await events.__anext__()
+        except StopAsyncIteration:
+            pass
+        except Exception as e:
+            logger.error(f"OCR streaming failed: {str(e)}")
+            yield _format_event({"event": "error", "detail": str(e)}, stream_format)
+        finally:
+            await events.aclose()
+
+    media_type = "text/event-stream" if stream_format == "sse" else "application/x-ndjson"
+    return StreamingResponse(event_stream(), media_type=media_type)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("app:app", host="0.0.0.0", port=8003, reload=True)
 
+@app.post("/extract/form", response_model=FormResult)
+async def extract_form(
+    file: UploadFile = File(...),
+    template: str = Form(...),
+    language: str = Form(None),
+    file_id: str = Form(None),
+    confidence_threshold: float = Form(30.0),
+    pages: str = Form(None)
+):
+    """Extract the fields of a known form type.
+
+    Pages are aligned to the named template (see /templates) and only its
+    field regions are OCR'd; the result maps field names to values.
+    """
+    if template not in processor.form_templates:
+        raise HTTPException(status_code=404, detail=f"Unknown form template: {template}")
+
+    file_content = await file.read()
+    _validate_upload(file.filename, file_content)
+    try:
+        result = await processor.extract_form(
+            file_content, file.filename, template,
+            language=language,
+            file_id=file_id,
+            confidence_threshold=confidence_threshold,
+            pages=pages
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Form extraction failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    logger.info(f"Extracted {len(result.fields)} fields from {file.filename} with template {template}")
+    return result
+
+@app.get("/templates")
+async def list_form_templates():
+    """Form templates available to /extract/form"""
+    return {"templates": [template.describe() for template in processor.form_templates.values()]}
+
 @app.get("/languages")
 async def get_supported_languages():
     """Get list of supported languages"""
+    if engine_state["capabilities"] is None:
+        raise HTTPException(status_code=503, detail=engine_state["error"] or "Warming up")
     return {
-        "supported_languages": pytesseract.get_languages(config=''),
+        "supported_languages": engine_state["capabilities"]["languages"],
         "default": "eng"
     }
 
+@app.get("/cache/stats")
+async def cache_stats():
+    """OCR result cache hit/miss counters"""
+    if processor.cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **processor.cache.stats()}
+
+@app.get("/admission/stats")
+async def admission_stats():
+    """In-flight work and rejection counters of admission control"""
+    return {"extract": admission.stats(), "queue": queue_guard.stats()}
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -125,51 +458,328 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "health": "/health",
+            "liveness": "/health/live",
+            "readiness": "/health/ready",
             "extract": "/extract",
-            "languages": "/languages"
+            "extract_stream": "/extract/stream",
+            "extract_batch": "/extract/batch",
+            "extract_form": "/extract/form",
+            "templates": "/templates",
+            "languages": "/languages",
+            "cache_stats": "/cache/stats",
+            "admission_stats": "/admission/stats"
         }
     }
 
 
-# Setup Redis and Queue
-redis_conn = Redis(host="redis", port=6379, decode_responses=True)
+# Setup Redis and Queue. RQ stores pickled jobs, so its connection must not
+# decode responses; partial results are JSON text and read through a decoding one
+redis_url = os.getenv('REDIS_URL', 'redis://redis:6379')
+redis_conn = Redis.from_url(redis_url)
+partial_conn = Redis.from_url(redis_url, decode_responses=True)
 task_queue = Queue(connection=redis_conn)
+lane_queues = {lane: Queue(lane, connection=redis_conn) for lane in LANES}
+queue_guard = QueueDepthGuard(settings.queue_max_depth, settings.admission_max_retry_after)
+
+def _enqueue_options() -> dict:
+    """Queued jobs expire with their spooled payload and retry as configured"""
+    options = {"ttl": int(settings.spool_ttl_hours * 3600)}
+    if settings.queue_job_retries:
+        options["retry"] = Retry(max=settings.queue_job_retries)
+    return options
+
+def _check_queue_depth():
+    """429 with Retry-After when the job queue is full"""
+    depth = task_queue.count + sum(queue.count for queue in lane_queues.values())
+    try:
+        queue_guard.check(depth)
+    except AdmissionRejected as e:
+        logger.warning(f"Rejected job: {str(e)}")
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
 
 @app.post("/queue")
 async def queue_file(
-    file: UploadFile = File(...),
+    file: UploadFile = File(None),
+    file_path: str = Form(None),
+    file_hash: str = Form(None),
     language: str = Form("eng"),
-    confidence_threshold: float = Form(30.0)
+    confidence_threshold: float = Form(30.0),
+    preprocessing: str = Form(None),
+    dpi_mode: str = Form(None),
+    min_dpi: int = Form(None),
+    max_dpi: int = Form(None),
+    pages: str = Form(None),
+    regions: str = Form(None),
+    region_units: str = Form("pixels"),
+    priority: str = Form(None)
 ):
-    """Queue file for background OCR processing"""
+    """Queue file for background OCR processing.
+
+    Uploads are spooled to disk and the job carries only their path and
+    hash, so Redis holds a small, fixed-size job whatever the file size.
+    A ``file_path`` on the uploads volume can be queued without uploading.
+    The job goes to the lane named by ``priority``, or else to one chosen
+    from its page count and file size.
+    """
+    if (file is None) == (file_path is None):
+        raise HTTPException(status_code=400, detail="Provide either file or file_path")
+    _check_queue_depth()
+
+    file_id = str(uuid.uuid4())
+    spooled = file is not None
     try:
-        file_content = await file.read()
-        file_id = str(uuid.uuid4())
+        if spooled:
+            filename = file.filename
+            _validate_filename(filename)
+            file_ext = filename.lower().split('.')[-1]
+            file_path = os.path.join(settings.spool_dir, f"{file_id}.{file_ext}")
+            file_hash, file_size = await spool_stream(file.read, file_path, settings.max_file_size)
+        else:
+            file_path = _resolve_upload_path(file_path)
+            filename = os.path.basename(file_path)
+            _validate_filename(filename)
+            file_ext = filename.lower().split('.')[-1]
+            if not os.path.isfile(file_path):
+                raise HTTPException(status_code=404, detail="File not found")
+            file_size = os.path.getsize(file_path)
+            _validate_size(file_size)
+    except SpoolLimitExceeded as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    try:
+        # Reject bad page and region selections now rather than failing the job
+        parse_page_spec(pages)
+        parse_regions(regions, region_units)
+        page_count = None
+        if not priority or pages:
+            page_count = await run_in_threadpool(count_pages, file_path, file_ext, pages)
+            if page_count == 0:
+                raise ValueError("Page selection matches no pages")
+        lane = choose_lane(settings, file_size, page_count, priority)
+    except ValueError as e:
+        if spooled:
+            remove_spooled(file_path)
+        raise HTTPException(status_code=400, detail=str(e))
 
-        job = task_queue.enqueue(
+    try:
+        job = lane_queues[lane].enqueue(
             run_ocr_job,
-            file_content,
-            file.filename,
+            file_path,
+            filename,
             language,
             file_id,
-            confidence_threshold
+            confidence_threshold,
+            preprocessing,
+            dpi_mode,
+            min_dpi,
+            max_dpi,
+            pages,
+            regions,
+            region_units,
+            file_hash,
+            spooled,
+            **_enqueue_options()
         )
+        queue_guard.enqueued()
 
-        return {"job_id": job.id, "file_id": file_id, "status": "queued"}
+        return {"job_id": job.id, "file_id": file_id, "status": "queued", "lane": lane}
 
     except Exception as e:
         logger.error(f"Failed to queue OCR job: {str(e)}")
+        if spooled:
+            remove_spooled(file_path)
         raise HTTPException(status_code=500, detail="Failed to queue job")
 
+def _resolve_manifest(manifest: str) -> List[dict]:
+    """Turn a JSON manifest of paths under the uploads volume into batch documents"""
+    try:
+        entries = json.loads(manifest)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="manifest must be a JSON list")
+    if not isinstance(entries, list):
+        raise HTTPException(status_code=400, detail="manifest must be a JSON list")
+
+    documents = []
+    for entry in entries:
+        if isinstance(entry, str):
+            entry = {"path": entry}
+        if not isinstance(entry, dict) or not entry.get("path"):
+            raise HTTPException(status_code=400, detail="manifest entries need a 'path'")
+
+        path = _resolve_upload_path(entry["path"])
+        filename = entry.get("filename") or os.path.basename(path)
+        _validate_filename(filename)
+        if os.path.isfile(path):
+            _validate_size(os.path.getsize(path))
+        documents.append({
+            "filename": filename,
+            "file_id": entry.get("file_id"),
+            "path": path,
+            "file_hash": entry.get("file_hash")
+        })
+    return documents
+
+
+@app.post("/extract/batch")
+async def extract_batch(
+    files: List[UploadFile] = File(None),
+    manifest: str = Form(None),
+    language: str = Form("eng"),
+    confidence_threshold: float = Form(30.0),
+    preprocessing: str = Form(None),
+    dpi_mode: str = Form(None),
+    min_dpi: int = Form(None),
+    max_dpi: int = Form(None),
+    result_format: str = Form("objects"),
+    mode: str = Form("stream"),
+    stream_format: str = Form("ndjson"),
+    pages: str = Form(None),
+    regions: str = Form(None),
+    region_units: str = Form("pixels"),
+    priority: str = Form("bulk")
+):
+    """Extract text from many files in one request.
+
+    Files are uploaded directly or listed in ``manifest``, a JSON list of
+    paths (or {"path", "filename", "file_id", "file_hash"} objects) relative
+    to the uploads volume, which are read in place. With mode "stream" each file's result is streamed as it
+    finishes, followed by a summary; mode "job" queues the batch and returns
+    a job handle for /queue/{job_id}, on the ``priority`` lane ("bulk" by default).
+    """
+    if mode not in ("stream", "job"):
+        raise HTTPException(status_code=400, detail="mode must be 'stream' or 'job'")
+    if stream_format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="stream_format must be 'ndjson' or 'sse'")
+    if result_format not in ("objects", "columnar"):
+        raise HTTPException(status_code=400, detail="result_format must be 'objects' or 'columnar'")
+    if mode == "job" and priority not in LANES:
+        raise HTTPException(status_code=400, detail=f"priority must be one of {LANES}")
+    try:
+        parse_page_spec(pages)
+        parse_regions(regions, region_units)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    documents = []
+    for file in files or []:
+        file_content = await file.read()
+        _validate_upload(file.filename, file_content)
+        documents.append({"filename": file.filename, "file_id": str(uuid.uuid4()), "content": file_content})
+    if manifest:
+        documents.extend(_resolve_manifest(manifest))
+
+    if not documents:
+        raise HTTPException(status_code=400, detail="Provide files or a manifest")
+    if len(documents) > settings.batch_max_files:
+        raise HTTPException(status_code=413, detail=f"Too many files. Max: {settings.batch_max_files}")
+
+    options = {
+        "language": language,
+        "confidence_threshold": confidence_threshold,
+        "preprocessing": preprocessing,
+        "dpi_mode": dpi_mode,
+        "min_dpi": min_dpi,
+        "max_dpi": max_dpi,
+        "compact": result_format == "columnar",
+        "pages": pages,
+        "regions": regions,
+        "region_units": region_units
+    }
+
+    if mode == "job":
+        _check_queue_depth()
+        # Spool uploaded content so the job carries paths rather than file bytes
+        try:
+            for document in documents:
+                content = document.pop("content", None)
+                if content is not None:
+                    file_ext = document["filename"].lower().split('.')[-1]
+                    document["path"] = os.path.join(settings.spool_dir, f"{document['file_id']}.{file_ext}")
+                    document["file_hash"] = await run_in_threadpool(spool_bytes, content, document["path"])
+                    document["spooled"] = True
+            job = lane_queues[priority].enqueue(run_ocr_batch_job, documents, **options, **_enqueue_options())
+            queue_guard.enqueued()
+        except Exception as e:
+            logger.error(f"Failed to queue OCR batch: {str(e)}")
+            for document in documents:
+                if document.get("spooled"):
+                    remove_spooled(document["path"])
+            raise HTTPException(status_code=500, detail="Failed to queue job")
+        return {"job_id": job.id, "status": "queued", "files": len(documents), "lane": priority}
+
+    async def event_stream():
+        start_time = time.time()
+        completed = failed = 0
+        try:
+            async for outcome in processor.iter_batch(documents, **options):
+                if outcome["status"] == "completed":
+                    completed += 1
+                    outcome["result"] = outcome["result"].model_dump()
+                else:
+                    failed += 1
+                yield _format_event({"event": "file", **outcome}, stream_format)
+        except Exception as e:
+            logger.error(f"OCR batch failed: {str(e)}")
+            yield _format_event({"event": "error", "detail": str(e)}, stream_format)
+            return
+
+        elapsed = time.time() - start_time
+        logger.info(f"Processed batch of {len(documents)} files in {elapsed:.2f}s")
+        yield _format_event({
+            "event": "summary",
+            "files": len(documents),
+            "completed": completed,
+            "failed": failed,
+            "processing_time": round(elapsed, 2),
+            "documents_per_second": round(len(documents) / elapsed, 2) if elapsed else None
+        }, stream_format)
+
+    media_type = "text/event-stream" if stream_format == "sse" else "application/x-ndjson"
+    return StreamingResponse(event_stream(), media_type=media_type)
+
+@app.get("/queue/lanes")
+def get_queue_lanes():
+    """Depth of each queue lane and its share of worker capacity"""
+    lanes = {}
+    for lane, queue in lane_queues.items():
+        lanes[lane] = {
+            "weight": settings.queue_lane_weights.get(lane, 1),
+            "queued": queue.count,
+            "started": queue.started_job_registry.count,
+            "failed": queue.failed_job_registry.count
+        }
+    # Jobs enqueued before lanes existed are still drained from the default queue
+    lanes["default"] = {
+        "weight": None,
+        "queued": task_queue.count,
+        "started": task_queue.started_job_registry.count,
+        "failed": task_queue.failed_job_registry.count
+    }
+    return {"lanes": lanes}
+
 @app.get("/queue/{job_id}")
-def get_queue_status(job_id: str):
-    """Check status/result of queued job"""
-    job = task_queue.fetch_job(job_id)
-    if not job:
+def get_queue_status(job_id: str, partial: bool = False):
+    """Check status/result of queued job.
+
+    While the job runs, ``progress`` reports pages done out of the total and
+    the moving-average seconds per page, with an ``eta_seconds`` estimate and
+    a suggested ``poll_after`` interval. With ``partial`` the text of pages
+    finished so far is included.
+    """
+    # Jobs live on whichever lane queue they were routed to, so fetch by id
+    try:
+        job = Job.fetch(job_id, connection=redis_conn)
+    except NoSuchJobError:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    return {
+    status = job.get_status()
+    meta = job.get_meta() or {}
+    response = {
         "job_id": job.id,
-        "status": job.get_status(),
+        "status": status,
+        **describe_progress(meta.get("progress"), status, settings.progress_min_poll, settings.progress_max_poll),
         "result": job.result if job.is_finished else None
     }
+    if partial and not job.is_finished:
+        response["partial"] = read_partial(partial_conn, job.id)
+    return response
@@ -0,0 +1,114 @@
+# bench_decode.py
+"""Compare per-page allocations of the legacy RGB decode path and the grayscale one.
+
+Usage: python bench_decode.py [--max-dpi 400] [--repeat 3] [image ...]
+
+Without arguments synthetic A4 pages are generated (colour JPEG, 1200 DPI
+JPEG, 1-bit fax TIFF, grayscale PNG). Peak memory is measured with
+tracemalloc, which sees NumPy arrays and Python byte buffers but not
+Pillow's internal decode buffers.
+"""
+import argparse
+import io
+import os
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+import cv2 # type: ignore
+import numpy as np # type: ignore
+from PIL import Image
+from decode import decode_gray
+
+A4_300 = (2480, 3508)
+
+# The synthetic 1200 DPI page is large on purpose
+Image.MAX_IMAGE_PIXELS = None
+
+
+def legacy_decode(content: bytes, max_dpi: int) -> np.ndarray:
+    """The previous path: decode, convert to RGB, copy into NumPy, then convert to gray"""
+    image = Image.open(io.BytesIO(content))
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    return cv2.cvtColor(np.array(image), cv2.COLOR_RGB2GRAY)
+
+
+def gray_decode(content: bytes, max_dpi: int) -> np.ndarray:
+    return decode_gray(io.BytesIO(content), max_dpi)[0]
+
+
+def _text_page(size: Tuple[int, int]) -> np.ndarray:
+    page = np.full((size[1], size[0]), 250, dtype=np.uint8)
+    scale = size[0] / 1000.0
+    for row in range(100, size[1] - 100, int(40 * scale)):
+        cv2.putText(page, "The quick brown fox jumps over the lazy dog 0123456789",
+                    (int(60 * scale), row), cv2.FONT_HERSHEY_SIMPLEX, 0.8 * scale, 20, max(1, int(2 * scale)))
+    return page
+
+
+def synthetic_pages() -> Dict[str, bytes]:
+    pages = {}
+    gray = _text_page(A4_300)
+    colour = np.dstack([gray, np.clip(gray.astype(np.int16) - 10, 0, 255).astype(np.uint8), gray])
+
+    buffer = io.BytesIO()
+    Image.fromarray(colour).save(buffer, "JPEG", quality=90, dpi=(300, 300))
+    pages["colour JPEG, 300 DPI"] = buffer.getvalue()
+
+    buffer = io.BytesIO()
+    Image.fromarray(_text_page((A4_300[0] * 4, A4_300[1] * 4))).convert("RGB").save(
+        buffer, "JPEG", quality=90, dpi=(1200, 1200))
+    pages["colour JPEG, 1200 DPI"] = buffer.getvalue()
+
+    buffer = io.BytesIO()
+    Image.fromarray(gray).point(lambda v: 255 if v > 128 else 0).convert("1").save(
+        buffer, "TIFF", compression="group4", dpi=(300, 300))
+    pages["1-bit G4 TIFF, 300 DPI"] = buffer.getvalue()
+
+    buffer = io.BytesIO()
+    Image.fromarray(gray).save(buffer, "PNG", dpi=(300, 300))
+    pages["grayscale PNG, 300 DPI"] = buffer.getvalue()
+    return pages
+
+
+def measure(decode: Callable[[bytes, int], np.ndarray], content: bytes, max_dpi: int,
+            repeat: int) -> Dict[str, float]:
+    """Best time and peak traced allocation of one decode"""
+    best = float("inf")
+    peak = 0
+    for _ in range(repeat):
+        tracemalloc.start()
+        start = time.perf_counter()
+        image = decode(content, max_dpi)
+        best = min(best, time.perf_counter() - start)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        shape = image.shape
+        del image
+    return {"ms": best * 1000, "peak_mb": peak / (1024 * 1024), "shape": shape}
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("images", nargs="*")
+    parser.add_argument("--max-dpi", type=int, default=400)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    if args.images:
+        pages = {}
+        for path in args.images:
+            with open(path, "rb") as f:
+                pages[os.path.basename(path)] = f.read()
+    else:
+        pages = synthetic_pages()
+
+    print(f"{'page':<26}{'path':<8}{'ms':>9}{'peak MB':>10}  shape")
+    for name, content in pages.items():
+        for label, decode in (("legacy", legacy_decode), ("gray", gray_decode)):
+            result = measure(decode, content, args.max_dpi, args.repeat)
+            print(f"{name:<26}{label:<8}{result['ms']:>9.1f}{result['peak_mb']:>10.1f}  {result['shape']}")
+
+
+if __name__ == "__main__":
+    main()
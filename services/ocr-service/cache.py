@@ -0,0 +1,168 @@
+# cache.py
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+from shared.models import CompactOCRResult
+
+logger = logging.getLogger(__name__)
+
+# Bump when the shape or semantics of cached results change
+CACHE_VERSION = 4
+
+
+class OCRResultCache:
+    """Content-addressed OCR result cache with an in-memory LRU tier and a size-bounded disk tier"""
+
+    def __init__(self, memory_items: int = 128, disk_dir: str = "", max_disk_bytes: int = 0):
+        self.memory_items = memory_items
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, CompactOCRResult]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            self._disk_bytes = sum(size for _, size, _ in self._scan_disk())
+
+    @staticmethod
+    def content_hash(content: bytes) -> str:
+        return hashlib.sha256(content).hexdigest()
+
+    @staticmethod
+    def make_key(content_hash: str, **options) -> str:
+        """Build a cache key from the content hash and everything that affects OCR output"""
+        options["version"] = CACHE_VERSION
+        encoded = json.dumps(options, sort_keys=True, default=str)
+        return hashlib.sha256(f"{content_hash}:{encoded}".encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[CompactOCRResult]:
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return result
+
+        result = self._read_disk(key)
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, result)
+        return result
+
+    def put(self, key: str, result: CompactOCRResult):
+        with self._lock:
+            self._remember(key, result)
+        self._write_disk(key, result)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_bytes": self._disk_bytes,
+                "evictions": self.evictions
+            }
+
+    def _remember(self, key: str, result: CompactOCRResult):
+        if self.memory_items <= 0:
+            return
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[CompactOCRResult]:
+        if not self.disk_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                result = CompactOCRResult.model_validate_json(f.read())
+            # Touch the entry so eviction treats it as recently used
+            os.utime(path)
+            return result
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Discarding unreadable cache entry {key}: {str(e)}")
+            self._remove(path)
+            return None
+
+    def _write_disk(self, key: str, result: CompactOCRResult):
+        if not self.disk_dir:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            data = result.model_dump_json().encode("utf-8")
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Failed to write cache entry {key}: {str(e)}")
+            self._remove(tmp_path)
+            return
+
+        with self._lock:
+            self._disk_bytes += len(data)
+            over_limit = self.max_disk_bytes and self._disk_bytes > self.max_disk_bytes
+        if over_limit:
+            self._evict_disk()
+
+    def _scan_disk(self):
+        """Yield (path, size, mtime) for every entry in the disk tier"""
+        for root, _, files in os.walk(self.disk_dir):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, st.st_size, st.st_mtime
+
+    def _evict_disk(self):
+        """Delete least recently used entries until the disk tier is back under its limit"""
+        entries = sorted(self._scan_disk(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        # Evict down to 90% so we don't rescan on every write
+        target = int(self.max_disk_bytes * 0.9)
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            if self._remove(path):
+                total -= size
+                with self._lock:
+                    self.evictions += 1
+        with self._lock:
+            self._disk_bytes = total
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
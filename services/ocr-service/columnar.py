@@ -0,0 +1,98 @@
+# columnar.py
+from typing import Dict, Iterable, List, Optional
+import numpy as np # type: ignore
+from shared.models import TextBlock, CompactTextBlocks
+
+
+class WordColumns:
+    """Words stored as parallel arrays instead of one TextBlock object per word.
+
+    ``line`` holds each word's [block, paragraph, line] numbers within its page.
+    """
+    __slots__ = ("text", "confidence", "bbox", "page", "line")
+
+    def __init__(self, text: List[str], confidence: np.ndarray, bbox: np.ndarray, page: np.ndarray,
+                 line: Optional[np.ndarray] = None):
+        self.text = text
+        self.confidence = np.asarray(confidence, dtype=np.float32)
+        self.bbox = np.asarray(bbox, dtype=np.int32).reshape(-1, 4)
+        self.page = np.asarray(page, dtype=np.int32)
+        if line is None:
+            line = np.zeros((len(text), 3))
+        self.line = np.asarray(line, dtype=np.int32).reshape(-1, 3)
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    @classmethod
+    def empty(cls) -> "WordColumns":
+        return cls([], np.empty(0), np.empty((0, 4)), np.empty(0), np.empty((0, 3)))
+
+    @classmethod
+    def for_page(cls, text: List[str], confidence, bbox, page_num: int, line=None) -> "WordColumns":
+        """Build columns for words that all sit on one page"""
+        return cls(text, confidence, bbox, np.full(len(text), page_num, dtype=np.int32), line)
+
+    @classmethod
+    def concat(cls, parts: Iterable["WordColumns"]) -> "WordColumns":
+        parts = [part for part in parts if len(part)]
+        if not parts:
+            return cls.empty()
+        text = []
+        for part in parts:
+            text.extend(part.text)
+        return cls(
+            text,
+            np.concatenate([part.confidence for part in parts]),
+            np.concatenate([part.bbox for part in parts]),
+            np.concatenate([part.page for part in parts]),
+            np.concatenate([part.line for part in parts])
+        )
+
+    @classmethod
+    def from_compact(cls, compact: CompactTextBlocks) -> "WordColumns":
+        if not compact.text:
+            return cls.empty()
+        return cls(compact.text, compact.confidence, compact.bbox, compact.page, compact.line)
+
+    def select(self, mask: np.ndarray) -> "WordColumns":
+        """Subset of words where ``mask`` is true"""
+        indices = np.flatnonzero(mask)
+        return WordColumns(
+            [self.text[i] for i in indices],
+            self.confidence[indices],
+            self.bbox[indices],
+            self.page[indices],
+            self.line[indices]
+        )
+
+    def mean_confidence(self) -> float:
+        """Average of the positive confidences, rounded for reporting"""
+        positive = self.confidence[self.confidence > 0]
+        return round(float(positive.mean()), 2) if positive.size else 0.0
+
+    def to_text_blocks(self) -> List[TextBlock]:
+        """Per-word objects for the legacy OCRResult format"""
+        # Values come from typed arrays, so pydantic validation can be skipped
+        confidence = np.round(self.confidence.astype(np.float64), 2).tolist()
+        bbox = self.bbox.tolist()
+        page = self.page.tolist()
+        line = self.line.tolist()
+        return [
+            TextBlock.model_construct(text=text, confidence=confidence[i], bbox=bbox[i], page=page[i],
+                                      line=line[i])
+            for i, text in enumerate(self.text)
+        ]
+
+    def to_compact(self) -> CompactTextBlocks:
+        return CompactTextBlocks.model_construct(**self.to_dict())
+
+    def to_dict(self) -> Dict[str, list]:
+        """Columnar JSON/msgpack-ready form"""
+        return {
+            "text": list(self.text),
+            "confidence": np.round(self.confidence.astype(np.float64), 2).tolist(),
+            "bbox": self.bbox.tolist(),
+            "page": self.page.tolist(),
+            "line": self.line.tolist()
+        }
@@ -1,6 +1,6 @@
 # config.py
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
 
 class Settings(BaseSettings):
     tesseract_cmd: str = "/usr/bin/tesseract"
@@ -10,7 +10,155 @@ class Settings(BaseSettings):
     max_file_size: int = 100 * 1024 * 1024  # 100MB
     temp_dir: str = "/tmp/ocr"
     confidence_threshold: float = 30.0
+
+    # Execution engine for CPU-bound OCR work: "process", "thread" or "inline"
+    ocr_execution_mode: str = "process"
+    ocr_workers: int = 0  # 0 = one worker per CPU core
+
+    # OCR backend: "tesserocr" keeps a warm in-process API per worker and language,
+    # "pytesseract" runs the tesseract binary per page, "auto" prefers tesserocr
+    ocr_engine: str = "auto"
+    tessdata_dir: str = ""  # empty = use TESSDATA_PREFIX
+
+    # Startup: query the engine's version and languages once (served by /health
+    # and /languages) and OCR a synthetic page per language in every worker.
+    # Each warmed language keeps a tesserocr API (its model) resident in every
+    # pool worker, so only common languages are warmed; others load on first use.
+    # Empty startup_warm_languages = every supported language that is installed
+    startup_warm_up: bool = True
+    startup_warm_languages: List[str] = ["eng"]
+
+    # Streaming rasterization: pages are rendered and OCR'd within a bounded window
+    pdf_dpi: int = 300  # fixed render DPI, and the reference DPI for all bboxes
+    page_window: int = 0  # max pages in flight; 0 = number of OCR workers
+    max_buffered_page_mb: int = 512  # cap on raster memory held by in-flight pages (per batch)
     
+    # Rasterization DPI: "fixed" renders at pdf_dpi, "adaptive" renders a low-DPI
+    # probe, measures glyph height and picks the lowest DPI that keeps text at
+    # the target height; both are clamped to [min_dpi, max_dpi]
+    dpi_mode: str = "fixed"
+    min_dpi: int = 150
+    max_dpi: int = 400
+    adaptive_dpi_probe: int = 100
+    adaptive_dpi_target_x_height: float = 22.0
+
+    # Preprocessing profile: "none", "fast", "full" or "auto" (chosen per page
+    # from a noise/contrast estimate on a subsampled copy)
+    preprocessing_profile: str = "auto"
+    preprocess_noise_low: float = 3.0
+    preprocess_noise_high: float = 8.0
+    preprocess_min_contrast: float = 80.0
+
+    # Second pass: lines whose mean confidence is below reocr_target_confidence
+    # (at most reocr_max_lines per page, weakest first) are cropped, upscaled and
+    # re-OCR'd with reocr_profile and page segmentation mode reocr_psm; the new
+    # read replaces the line if its confidence is at least reocr_min_gain higher
+    reocr_enabled: bool = False
+    reocr_target_confidence: float = 60.0
+    reocr_max_lines: int = 50
+    reocr_min_gain: float = 5.0
+    reocr_profile: str = "full"
+    reocr_psm: int = 7  # treat the crop as a single text line
+
+    # Use the embedded text layer of born-digital PDF pages instead of OCR.
+    # Pages are still OCR'd when images cover more than text_layer_max_image_coverage
+    # of the page (a scan with a stamped header or Bates number) or when text lines
+    # cover less than text_layer_min_line_coverage of its height
+    text_layer_enabled: bool = True
+    text_layer_min_words: int = 5
+    text_layer_min_valid_ratio: float = 0.9
+    text_layer_max_image_coverage: float = 0.5
+    text_layer_min_line_coverage: float = 0.05
+
+    # Page filters for image pages, checked on a thumbnail before OCR: pages
+    # with almost no ink (or near-uniform) are skipped as blank, pages matching
+    # an image in separator_templates_dir are skipped as separator sheets, and a
+    # page repeating an earlier page of the same document reuses its result.
+    # Matches need a close 256-cell difference hash, an ink bounding box in the
+    # same place, and at most duplicate_max_ink_diff of the ink pixels inside it
+    # differing (compared at 768x768, so a changed amount or name is enough)
+    page_filters_enabled: bool = True
+    blank_max_ink_ratio: float = 0.0003
+    blank_max_stddev: float = 2.0
+    duplicate_max_hash_distance: int = 6
+    duplicate_max_ink_diff: float = 0.005
+    separator_templates_dir: str = ""
+
+    # Form templates: JSON files in form_templates_dir name field boxes on a
+    # reference page; pages are aligned to it (ORB features on a copy reduced to
+    # form_align_max_side, RANSAC homography, else plain scaling) and only the
+    # field crops are OCR'd
+    form_templates_dir: str = "/app/form_templates"
+    form_align_max_side: int = 1000
+    form_align_features: int = 2000
+    form_align_min_inliers: int = 12
+
+    # Tiling: images larger than tile_min_megapixels are OCR'd as overlapping
+    # horizontal strips in parallel and merged
+    tiling_enabled: bool = True
+    tile_min_megapixels: float = 40.0
+    tile_height: int = 2048
+    tile_overlap: int = 128
+
+    # Content-addressed OCR result cache
+    cache_enabled: bool = True
+    cache_memory_items: int = 128
+    cache_dir: str = "/tmp/ocr/cache"
+    cache_max_disk_mb: int = 1024
+
+    # Batch extraction: manifests reference files under upload_dir (the shared
+    # uploads volume); batch_concurrency documents share the worker pool at once
+    upload_dir: str = "/app/uploads"
+    batch_max_files: int = 1000
+    batch_concurrency: int = 0  # 0 = page window size
+
+    # Queued uploads are spooled here (on the volume shared with ocr-worker) and
+    # jobs carry only the path and hash; files of jobs that never ran expire after
+    # spool_ttl_hours, and so do the queued jobs themselves. A failed job keeps its
+    # file while it has some of its queue_job_retries automatic retries left
+    spool_dir: str = "/app/uploads/.ocr-spool"
+    spool_ttl_hours: float = 24.0
+    queue_job_retries: int = 0
+
+    # RQ worker: prefork worker_processes warm processes (0 = one per CPU core),
+    # each replaced after worker_max_jobs jobs or once its RSS exceeds worker_max_rss_mb
+    worker_processes: int = 0
+    worker_max_jobs: int = 500
+    worker_max_rss_mb: int = 1536
+    worker_warm_languages: List[str] = ["eng"]
+
+    # Queue lanes: jobs go to "interactive", "standard" or "bulk" by explicit
+    # priority or by page count and file size; workers dequeue across lanes in
+    # proportion to queue_lane_weights so small jobs aren't stuck behind backfill
+    queue_lane_weights: Dict[str, int] = {"interactive": 6, "standard": 3, "bulk": 1}
+    lane_interactive_max_pages: int = 5
+    lane_interactive_max_mb: float = 5.0
+    lane_standard_max_pages: int = 50
+    lane_standard_max_mb: float = 50.0
+
+    # Queued job progress: workers publish pages done and a moving average of
+    # seconds per page into the job's metadata; /queue/{job_id} derives an ETA
+    # and a suggested poll interval clamped to [progress_min_poll, progress_max_poll]
+    progress_ema_alpha: float = 0.3
+    progress_min_poll: float = 1.0
+    progress_max_poll: float = 30.0
+    # Expose finished pages' text via /queue/{job_id}?partial=true; each page is
+    # appended once to a per-job Redis list that expires progress_partial_ttl
+    # seconds after the last page
+    progress_partial_results: bool = False
+    progress_partial_ttl: int = 3600
+
+    # Admission control for /extract endpoints: at most admission_max_requests
+    # requests and admission_max_mb of request bodies in flight (0 = unlimited);
+    # up to admission_max_waiting more wait admission_max_wait seconds, the rest
+    # get 429 with a Retry-After estimated from recent request times
+    admission_max_requests: int = 16
+    admission_max_mb: int = 512
+    admission_max_waiting: int = 64
+    admission_max_wait: float = 30.0
+    admission_max_retry_after: int = 120
+    queue_max_depth: int = 10000  # /queue answers 429 beyond this many waiting jobs
+
     class Config:
         env_file = ".env"
         
@@ -0,0 +1,40 @@
+# decode.py
+import math
+from typing import Optional, Tuple
+import numpy as np # type: ignore
+from PIL import Image
+
+
+def to_gray_array(image: Image.Image) -> np.ndarray:
+    """Return a decoded image as an 8-bit grayscale array.
+
+    NumPy copies the pixels out of Pillow once (via ``tobytes``) into a
+    read-only array; no RGB image or second copy is made. Bilevel (fax)
+    images are decoded at one bit per pixel and come out as 0/255 bytes.
+    """
+    if image.mode == "1":
+        # Pillow exposes mode "1" as bytes of 0/255 typed as bool
+        return np.asarray(image).view(np.uint8)
+    if image.mode != "L":
+        image = image.convert("L")
+    return np.asarray(image)
+
+
+def decode_gray(source, max_dpi: Optional[int] = None) -> Tuple[np.ndarray, float]:
+    """Decode an image file straight to 8-bit grayscale.
+
+    libjpeg decodes JPEGs directly to grayscale. When a JPEG's DPI is at
+    least twice ``max_dpi``, it also uses DCT scaling (1/2, 1/4 or 1/8) down
+    to no less than ``max_dpi``. Returns (array, scale), where scale maps
+    decoded pixels back to the file's pixels.
+    """
+    with Image.open(source) as image:
+        width, height = image.size
+        if image.format == "JPEG":
+            size = image.size
+            dpi = float((image.info.get("dpi") or (0, 0))[0])
+            if max_dpi and dpi >= 2 * max_dpi:
+                size = (math.ceil(width * max_dpi / dpi), math.ceil(height * max_dpi / dpi))
+            image.draft("L", size)
+        array = to_gray_array(image)
+    return array, width / array.shape[1]
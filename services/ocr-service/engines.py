@@ -0,0 +1,132 @@
+# engines.py
+import logging
+import threading
+from typing import Dict, Optional
+import numpy as np # type: ignore
+import pytesseract
+from PIL import Image
+
+try:
+    import tesserocr # type: ignore
+except ImportError:
+    tesserocr = None
+
+logger = logging.getLogger(__name__)
+
+# Column header of Tesseract's TSV output (the C API omits it)
+TSV_HEADER = "\t".join([
+    "level", "page_num", "block_num", "par_num", "line_num", "word_num",
+    "left", "top", "width", "height", "conf", "text"
+])
+
+
+class PytesseractEngine:
+    """Runs the tesseract binary once per page via pytesseract"""
+    name = "pytesseract"
+
+    def image_to_tsv(self, image: np.ndarray, language: str, psm: Optional[int] = None) -> str:
+        config = f"--psm {psm}" if psm else ""
+        return pytesseract.image_to_data(
+            image,
+            lang=language,
+            config=config,
+            output_type=pytesseract.Output.STRING
+        )
+
+
+class TesserocrEngine:
+    """Keeps one long-lived Tesseract API per thread and language, reused across pages"""
+    name = "tesserocr"
+
+    def __init__(self, tessdata_dir: str = ""):
+        self.tessdata_dir = tessdata_dir
+        self._local = threading.local()
+        self.unavailable = set()  # languages the API failed to initialise
+
+    def _get_api(self, language: str):
+        apis = getattr(self._local, "apis", None)
+        if apis is None:
+            apis = self._local.apis = {}
+
+        api = apis.get(language)
+        if api is None:
+            kwargs = {"lang": language}
+            if self.tessdata_dir:
+                kwargs["path"] = self.tessdata_dir
+            try:
+                api = tesserocr.PyTessBaseAPI(**kwargs)
+            except RuntimeError:
+                self.unavailable.add(language)
+                raise
+            apis[language] = api
+            logger.info(f"Loaded Tesseract API for language '{language}'")
+        return api
+
+    def image_to_tsv(self, image: np.ndarray, language: str, psm: Optional[int] = None) -> str:
+        api = self._get_api(language)
+        api.SetPageSegMode(psm if psm is not None else tesserocr.PSM.AUTO)
+
+        if image.ndim == 2 and image.dtype == np.uint8:
+            image = np.ascontiguousarray(image)
+            height, width = image.shape
+            api.SetImageBytes(image.tobytes(), width, height, 1, width)
+        else:
+            api.SetImage(Image.fromarray(image))
+
+        try:
+            tsv = api.GetTSVText(0) or ""
+        finally:
+            api.Clear()
+
+        return f"{TSV_HEADER}\n{tsv}"
+
+
+_engines: Dict[str, object] = {}
+_fallback = PytesseractEngine()
+
+
+def get_engine(name: str = "auto", tessdata_dir: str = ""):
+    """Return the process-wide OCR engine, falling back to pytesseract"""
+    engine = _engines.get(name)
+    if engine is not None:
+        return engine
+
+    if name in ("auto", "tesserocr") and tesserocr is not None:
+        engine = TesserocrEngine(tessdata_dir)
+    else:
+        if name == "tesserocr":
+            logger.warning("tesserocr is not installed, falling back to pytesseract")
+        engine = _fallback
+
+    _engines[name] = engine
+    return engine
+
+
+def image_to_tsv(image: np.ndarray, language: str, engine_name: str = "auto",
+                 tessdata_dir: str = "", psm: Optional[int] = None) -> str:
+    """Run OCR on an image with the configured engine, returning Tesseract TSV"""
+    engine = get_engine(engine_name, tessdata_dir)
+    if engine is not _fallback and language in engine.unavailable:
+        return _fallback.image_to_tsv(image, language, psm)
+    try:
+        return engine.image_to_tsv(image, language, psm)
+    except RuntimeError as e:
+        # tesserocr raises RuntimeError when it cannot initialise a language;
+        # the engine remembers that, so later pages go straight to pytesseract
+        if engine is _fallback:
+            raise
+        logger.warning(f"{engine.name} failed for '{language}' ({str(e)}), falling back to pytesseract")
+        return _fallback.image_to_tsv(image, language, psm)
+
+
+def engine_capabilities(engine_name: str = "auto", tessdata_dir: str = "") -> Dict:
+    """Engine in use, Tesseract version and installed languages.
+
+    Runs the tesseract binary, so callers should cache the result.
+    """
+    config = f'--tessdata-dir "{tessdata_dir}"' if tessdata_dir else ''
+    return {
+        "engine": get_engine(engine_name, tessdata_dir).name,
+        "tesseract_version": str(pytesseract.get_tesseract_version()),
+        "languages": sorted(pytesseract.get_languages(config=config))
+    }
@@ -0,0 +1,180 @@
+# forms.py
+import json
+import logging
+import math
+import os
+from typing import Dict, List, Optional, Tuple
+import cv2 # type: ignore
+import numpy as np # type: ignore
+from decode import decode_gray
+
+logger = logging.getLogger(__name__)
+
+# Lowe's ratio test for ORB matches
+MATCH_RATIO = 0.75
+
+
+class FormTemplate:
+    """A fixed form layout: named field boxes in the coordinates of a reference page.
+
+    Template files are JSON::
+
+        {"name": "invoice-acme", "description": "...",
+         "reference": "invoice-acme.png", "language": "eng",
+         "fields": [{"name": "invoice_number", "box": [x, y, width, height], "psm": 7}]}
+
+    ``reference`` is an image of the form (relative to the template file)
+    that incoming pages are aligned to; without one, ``size`` [width,
+    height] gives the coordinate space and pages are only scaled onto it.
+    ``units`` "normalized" gives boxes as fractions of that size. ``psm``
+    is the Tesseract page segmentation mode per field (7, a single line, by
+    default; 6 for multi-line blocks).
+    """
+
+    def __init__(self, name: str, fields: List[Dict], size: Tuple[int, int],
+                 description: str = "", language: Optional[str] = None,
+                 points: Optional[np.ndarray] = None, descriptors: Optional[np.ndarray] = None):
+        self.name = name
+        self.fields = fields
+        self.size = size
+        self.description = description
+        self.language = language
+        self.points = points
+        self.descriptors = descriptors
+
+    @classmethod
+    def load(cls, path: str, max_side: int, n_features: int) -> "FormTemplate":
+        with open(path) as f:
+            spec = json.load(f)
+        name = spec.get("name") or os.path.splitext(os.path.basename(path))[0]
+
+        points = descriptors = None
+        if spec.get("reference"):
+            reference, _ = decode_gray(os.path.join(os.path.dirname(path), spec["reference"]))
+            size = (reference.shape[1], reference.shape[0])
+            points, descriptors = detect_features(reference, max_side, n_features)
+        elif spec.get("size"):
+            size = tuple(int(v) for v in spec["size"])
+        else:
+            raise ValueError(f"Template {name} needs a reference image or a size")
+
+        fields = []
+        for field in spec.get("fields") or []:
+            box = field.get("box")
+            if (not field.get("name") or not isinstance(box, list) or len(box) != 4
+                    or not all(isinstance(v, (int, float)) for v in box) or box[2] <= 0 or box[3] <= 0):
+                raise ValueError(f"Template {name} has an invalid field: {field}")
+            if spec.get("units") == "normalized":
+                box = [box[0] * size[0], box[1] * size[1], box[2] * size[0], box[3] * size[1]]
+            fields.append({"name": field["name"], "box": [float(v) for v in box], "psm": int(field.get("psm", 7))})
+        if not fields:
+            raise ValueError(f"Template {name} has no fields")
+        if len({field["name"] for field in fields}) != len(fields):
+            raise ValueError(f"Template {name} has duplicate field names")
+
+        return cls(name, fields, size, spec.get("description", ""), spec.get("language"), points, descriptors)
+
+    def describe(self) -> Dict:
+        return {
+            "name": self.name,
+            "description": self.description,
+            "language": self.language,
+            "size": list(self.size),
+            "aligned": self.descriptors is not None,
+            "fields": [field["name"] for field in self.fields]
+        }
+
+
+def load_templates(template_dir: str, max_side: int = 1000, n_features: int = 2000) -> Dict[str, FormTemplate]:
+    """Load every *.json template in ``template_dir``, skipping invalid ones"""
+    templates = {}
+    if not template_dir or not os.path.isdir(template_dir):
+        return templates
+    for name in sorted(os.listdir(template_dir)):
+        if not name.endswith(".json"):
+            continue
+        try:
+            template = FormTemplate.load(os.path.join(template_dir, name), max_side, n_features)
+            templates[template.name] = template
+        except Exception as e:
+            logger.warning(f"Skipping form template {name}: {str(e)}")
+    logger.info(f"Loaded {len(templates)} form templates from {template_dir}")
+    return templates
+
+
+def detect_features(gray: np.ndarray, max_side: int, n_features: int) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """ORB keypoints (in full-resolution coordinates) and descriptors of a page.
+
+    Features are detected on a copy reduced to ``max_side`` pixels, which is
+    plenty to register a page and keeps this cheap at any resolution.
+    """
+    scale = min(1.0, max_side / max(gray.shape[:2]))
+    small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1.0 else gray
+    keypoints, descriptors = cv2.ORB_create(n_features).detectAndCompute(small, None)
+    points = np.float32([kp.pt for kp in keypoints]).reshape(-1, 2) / scale
+    return points, descriptors
+
+
+def align_page(gray: np.ndarray, template: FormTemplate, max_side: int, n_features: int,
+               min_inliers: int) -> Tuple[np.ndarray, Dict]:
+    """Homography mapping template coordinates onto the page.
+
+    Matches ORB features against the template's reference and fits a
+    RANSAC homography. If that fails (no reference, too few inliers or an
+    implausible fit) the template is just scaled to the page size.
+    """
+    height, width = gray.shape[:2]
+    fallback = np.diag([width / template.size[0], height / template.size[1], 1.0])
+    if template.descriptors is None:
+        return fallback, {"method": "scale"}
+
+    points, descriptors = detect_features(gray, max_side, n_features)
+    info = {"method": "scale", "matches": 0, "inliers": 0}
+    if descriptors is None or len(descriptors) < 2:
+        return fallback, info
+
+    pairs = cv2.BFMatcher(cv2.NORM_HAMMING).knnMatch(template.descriptors, descriptors, k=2)
+    good = [pair[0] for pair in pairs if len(pair) == 2 and pair[0].distance < MATCH_RATIO * pair[1].distance]
+    info["matches"] = len(good)
+    if len(good) < min_inliers:
+        return fallback, info
+
+    src = template.points[[m.queryIdx for m in good]]
+    dst = points[[m.trainIdx for m in good]]
+    reproj_threshold = 3.0 * max(1.0, max(gray.shape[:2]) / max_side)
+    homography, mask = cv2.findHomography(src, dst, cv2.RANSAC, reproj_threshold)
+    inliers = int(mask.sum()) if mask is not None else 0
+    info["inliers"] = inliers
+    if homography is None or inliers < min_inliers:
+        return fallback, info
+
+    # Reject fits that flip, shear or scale far beyond what a scan can do
+    expected = math.sqrt(abs(np.linalg.det(fallback[:2, :2])))
+    scale = math.sqrt(abs(np.linalg.det(homography[:2, :2])))
+    if np.linalg.det(homography[:2, :2]) <= 0 or not 0.5 < scale / expected < 2.0:
+        return fallback, info
+
+    info["method"] = "homography"
+    return homography, info
+
+
+def field_crop(gray: np.ndarray, homography: np.ndarray, box: List[float]) -> Tuple[np.ndarray, List[int]]:
+    """Rectified crop of a template field from the page, at the page's resolution.
+
+    Returns the crop and the field's axis-aligned bounding box on the page.
+    """
+    x, y, w, h = box
+    scale = math.sqrt(abs(np.linalg.det(homography[:2, :2])))
+    out_w, out_h = max(1, int(round(w * scale))), max(1, int(round(h * scale)))
+    # Crop pixel (u, v) comes from template point (x + u / scale, y + v / scale)
+    to_template = np.array([[1.0 / scale, 0, x], [0, 1.0 / scale, y], [0, 0, 1]])
+    crop = cv2.warpPerspective(
+        gray, homography @ to_template, (out_w, out_h),
+        flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP, borderValue=255
+    )
+
+    corners = np.float32([[x, y], [x + w, y], [x + w, y + h], [x, y + h]]).reshape(-1, 1, 2)
+    on_page = cv2.perspectiveTransform(corners, homography).reshape(-1, 2)
+    x0, y0 = np.floor(on_page.min(axis=0))
+    x1, y1 = np.ceil(on_page.max(axis=0))
+    return crop, [int(x0), int(y0), int(x1 - x0), int(y1 - y0)]
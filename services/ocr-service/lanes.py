@@ -0,0 +1,70 @@
+# lanes.py
+import logging
+from typing import Dict, List, Optional
+from PIL import Image
+from rasterizer import pdf_page_count
+from regions import parse_page_spec, select_pages
+
+logger = logging.getLogger(__name__)
+
+# Queue lanes from most to least latency-sensitive
+LANES = ["interactive", "standard", "bulk"]
+
+
+def count_pages(path: str, file_ext: str, pages: Optional[str] = None) -> Optional[int]:
+    """Number of pages a job will process, or None if the file can't be inspected cheaply"""
+    try:
+        if file_ext == "pdf":
+            total = pdf_page_count(path)
+        elif file_ext in ("tif", "tiff"):
+            with Image.open(path) as image:
+                total = getattr(image, "n_frames", 1)
+        else:
+            total = 1
+        return len(select_pages(parse_page_spec(pages), total))
+    except Exception as e:
+        logger.warning(f"Could not count pages of {path}: {str(e)}")
+        return None
+
+
+def choose_lane(settings, file_size: int, page_count: Optional[int] = None,
+                priority: Optional[str] = None) -> str:
+    """Route a job by explicit priority, else by page count and file size"""
+    if priority:
+        if priority not in LANES:
+            raise ValueError(f"Unknown priority lane: {priority}. Allowed: {LANES}")
+        return priority
+
+    size_mb = file_size / (1024 * 1024)
+    pages = page_count if page_count is not None else 0
+    if pages <= settings.lane_interactive_max_pages and size_mb <= settings.lane_interactive_max_mb:
+        return "interactive"
+    if pages <= settings.lane_standard_max_pages and size_mb <= settings.lane_standard_max_mb:
+        return "standard"
+    return "bulk"
+
+
+class SmoothWeightedRoundRobin:
+    """Orders lanes for the next dequeue so that busy lanes are served in proportion to their weights.
+
+    Every served job adds each lane's weight to its credit and charges the
+    serving lane the total weight (nginx-style smooth weighted round robin).
+    Lanes are tried in order of credit, so an empty lane never blocks the
+    others. Credit is kept within [-total, total]: an idle lane cannot build
+    up a burst, and a lane served alone while the others were idle is not
+    left in a debt that starves it once they get busy again.
+    """
+
+    def __init__(self, weights: Dict[str, int]):
+        self.weights = {lane: max(1, int(weight)) for lane, weight in weights.items()}
+        self.total = sum(self.weights.values())
+        self.credit = {lane: 0 for lane in self.weights}
+
+    def served(self, lane: str):
+        for name, weight in self.weights.items():
+            self.credit[name] = min(self.credit[name] + weight, self.total)
+        if lane in self.credit:
+            self.credit[lane] = max(self.credit[lane] - self.total, -self.total)
+
+    def order(self) -> List[str]:
+        return sorted(self.weights, key=lambda lane: (-self.credit[lane], -self.weights[lane]))
@@ -5,178 +5,1059 @@ import pytesseract
 import cv2 # type: ignore
 import numpy as np # type: ignore
 from PIL import Image
-from pdf2image import convert_from_bytes # type: ignore
 import tempfile
+import mmap
 import os
 import logging
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, AsyncIterator, Callable, Optional, Union
 import time
+import asyncio
+from collections import deque
+from itertools import compress
 from datetime import datetime
-from shared.models import OCRResult, TextBlock
+from shared.models import OCRResult, CompactOCRResult, FormResult, FormPage, FormField
+from utils import run_in_threadpool, run_in_processpool
+from rasterizer import pdf_page_count, render_pdf_page, choose_pdf_dpi
+from engines import image_to_tsv, get_engine, engine_capabilities
+from tsv import parse_tsv, word_mask, confidence_stats, concat_words
+from regions import parse_page_spec, select_pages, parse_regions, to_pixel_boxes, words_in_regions
+from cache import OCRResultCache
+from text_layer import open_document, extract_page_words, page_size
+from preprocessing import PROFILES, AUTO, preprocess
+from columnar import WordColumns
+from tiling import strip_bounds, merge_strips, scale_boxes
+from decode import decode_gray, to_gray_array
+from page_filters import PageFilter, load_templates
+from reocr import reocr_weak_lines
+from forms import load_templates as load_form_templates, align_page, field_crop
 
 logger = logging.getLogger(__name__)
 
+# A page to process: an image to OCR, or words taken from the PDF text layer
+PageInput = Union[np.ndarray, WordColumns]
+
+
+class PageBudget:
+    """Page rasters in flight, counted against a page and a byte limit.
+
+    One budget is shared by every document of a batch, so concurrent
+    documents split the limits instead of each getting its own. A page is
+    always admitted when nothing else is in flight, however large.
+    """
+
+    def __init__(self, max_pages: int, max_bytes: int):
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        self.pages = 0
+        self.bytes = 0
+        self._waiters = deque()
+
+    def _fits(self, nbytes: int) -> bool:
+        return self.pages == 0 or (self.pages < self.max_pages and self.bytes + nbytes <= self.max_bytes)
+
+    async def acquire(self, nbytes: int):
+        while not self._fits(nbytes):
+            waiter = asyncio.get_event_loop().create_future()
+            self._waiters.append(waiter)
+            await waiter
+        self.pages += 1
+        self.bytes += nbytes
+
+    def release(self, nbytes: int):
+        self.pages -= 1
+        self.bytes -= nbytes
+        # Wake everyone; each waiter re-checks whether its page fits now
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+
+
+# ---------------------------------
+# Page-level OCR (runs in pool workers)
+# ---------------------------------
+
+# Engine and preprocessing configuration for the current process, set by _init_worker
+_worker_config: Dict = {"engine": "auto", "tessdata_dir": ""}
+
+
+def _init_worker(config: Dict):
+    """Initializer for OCR pool worker processes"""
+    pytesseract.pytesseract.tesseract_cmd = config["tesseract_cmd"]
+    _worker_config.update(config)
+
+
+def _ocr_image(image: np.ndarray, language: str, profile: str, psm: Optional[int] = None) -> Tuple[Dict, Dict]:
+    """Preprocess an image and run Tesseract on it, returning parsed TSV columns"""
+    # Preprocess image for better OCR
+    processed_image, info = preprocess(
+        image, profile,
+        noise_low=_worker_config.get("noise_low", 3.0),
+        noise_high=_worker_config.get("noise_high", 8.0),
+        min_contrast=_worker_config.get("min_contrast", 80.0)
+    )
+
+    # Get detailed OCR data
+    tsv = image_to_tsv(
+        processed_image,
+        language,
+        engine_name=_worker_config["engine"],
+        tessdata_dir=_worker_config["tessdata_dir"],
+        psm=psm
+    )
+    return parse_tsv(tsv), info
+
+
+def _second_pass(image: np.ndarray, words: Dict, language: str, info: Dict) -> Dict:
+    """Re-OCR weak lines of a first-pass read when the second pass is enabled"""
+    config = _worker_config.get("reocr")
+    if not config:
+        return words
+    words, info["reocr"] = reocr_weak_lines(
+        image, words,
+        lambda crop: _ocr_image(crop, language, config["profile"], config["psm"])[0],
+        target=config["target_confidence"],
+        max_lines=config["max_lines"],
+        min_gain=config["min_gain"]
+    )
+    return words
+
+
+def _synthetic_page() -> np.ndarray:
+    """A small image with a line of printed text, enough to exercise recognition"""
+    page = np.full((64, 480), 255, dtype=np.uint8)
+    cv2.putText(page, "Warm up 0123456789", (8, 44), cv2.FONT_HERSHEY_SIMPLEX, 1.0, 0, 2, cv2.LINE_AA)
+    return page
+
+
+def warm_languages(languages: List[str]) -> Dict[str, float]:
+    """OCR a synthetic page per language so models and OpenCV are loaded in this process.
+
+    Returns the time taken per language in seconds; languages that fail to
+    load are logged and left out.
+    """
+    page = _synthetic_page()
+    timings = {}
+    for language in languages:
+        start = time.perf_counter()
+        try:
+            _ocr_image(page, language, AUTO)
+            timings[language] = round(time.perf_counter() - start, 3)
+        except Exception as e:
+            logger.warning(f"Warm-up failed for language '{language}': {str(e)}")
+    return timings
+
+
+def ocr_page(image: np.ndarray, language: str, page_num: int, confidence_threshold: float,
+             profile: str = AUTO, bbox_scale: float = 1.0, regions: Optional[List[List[float]]] = None,
+             region_units: str = "pixels") -> Tuple[WordColumns, Dict]:
+    """Preprocess a single page and extract text blocks with Tesseract.
+
+    ``bbox_scale`` maps boxes from the rendered image back to the document's
+    reference resolution when the page was rendered at a different DPI.
+    With ``regions`` only those crops of the page are OCR'd; their boxes are
+    offset back to page coordinates. When the second pass is configured,
+    lines read below its target confidence are re-OCR'd before filtering.
+    """
+    if regions is None:
+        words, page_info = _ocr_image(image, language, profile)
+        words = _second_pass(image, words, language, page_info)
+    else:
+        height, width = image.shape[:2]
+        parts, region_info = [], []
+        for x0, y0, x1, y1 in to_pixel_boxes(regions, region_units, width, height, 1.0 / bbox_scale).tolist():
+            part, info = _ocr_image(image[y0:y1, x0:x1], language, profile)
+            part = _second_pass(image[y0:y1, x0:x1], part, language, info)
+            part["bbox"][:, 0] += x0
+            part["bbox"][:, 1] += y0
+            parts.append(part)
+            box = np.rint(np.array([x0, y0, x1 - x0, y1 - y0]) * bbox_scale).astype(int).tolist()
+            region_info.append({"box": box, **info})
+        words = concat_words(parts) if parts else parse_tsv("")
+        page_info = {
+            "regions": region_info,
+            "preprocessing_ms": round(sum(info["preprocessing_ms"] for info in region_info), 1)
+        }
+
+    # Filter by confidence and non-empty text
+    mask = word_mask(words, confidence_threshold)
+    page_info.update(confidence_stats(words, mask))
+
+    bbox = words["bbox"][mask]
+    if bbox_scale != 1.0:
+        bbox = np.rint(bbox * bbox_scale)
+
+    texts = list(compress(words["text"], mask))
+    lines = np.stack([words["block_num"], words["par_num"], words["line_num"]], axis=1)[mask]
+    return WordColumns.for_page(texts, words["conf"][mask], bbox, page_num, lines), page_info
+
+
+def ocr_field(crop: np.ndarray, language: str, psm: int, confidence_threshold: float) -> Dict:
+    """OCR one form field crop, returning its text (lines joined by newlines) and mean confidence"""
+    words, _ = _ocr_image(crop, language, AUTO, psm)
+    mask = word_mask(words, confidence_threshold)
+    lines = []
+    last_line = None
+    for i in np.flatnonzero(mask):
+        line = (words["block_num"][i], words["par_num"][i], words["line_num"][i])
+        if line != last_line:
+            lines.append([])
+            last_line = line
+        lines[-1].append(words["text"][i])
+    conf = words["conf"][mask]
+    return {
+        "value": "\n".join(" ".join(line) for line in lines),
+        "confidence": round(float(conf.mean()), 2) if conf.size else 0.0
+    }
+
+
 class OCRProcessor:
     def __init__(self, settings):
         self.settings = settings
-        pytesseract.pytesseract.tesseract_cmd = settings.tesseract_cmd
+        self._worker_config = {
+            "tesseract_cmd": settings.tesseract_cmd,
+            "engine": settings.ocr_engine,
+            "tessdata_dir": settings.tessdata_dir,
+            "noise_low": settings.preprocess_noise_low,
+            "noise_high": settings.preprocess_noise_high,
+            "min_contrast": settings.preprocess_min_contrast,
+            "reocr": {
+                "target_confidence": settings.reocr_target_confidence,
+                "max_lines": settings.reocr_max_lines,
+                "min_gain": settings.reocr_min_gain,
+                "profile": settings.reocr_profile,
+                "psm": settings.reocr_psm
+            } if settings.reocr_enabled else None
+        }
+        _init_worker(self._worker_config)
+        logger.info(f"OCR engine: {get_engine(settings.ocr_engine, settings.tessdata_dir).name}")
+
+        self.cache = None
+        if settings.cache_enabled:
+            self.cache = OCRResultCache(
+                memory_items=settings.cache_memory_items,
+                disk_dir=settings.cache_dir,
+                max_disk_bytes=settings.cache_max_disk_mb * 1024 * 1024
+            )
+
+        self.separator_templates = []
+        if settings.page_filters_enabled:
+            self.separator_templates = load_templates(settings.separator_templates_dir)
+
+        self.form_templates = load_form_templates(
+            settings.form_templates_dir, settings.form_align_max_side, settings.form_align_features
+        )
 
         # Create temp directory if it doesn't exist
         os.makedirs(settings.temp_dir, exist_ok=True)
 
-    async def process_file(self, file_content: bytes, filename: str, 
+    def warm_up(self, languages: Optional[List[str]] = None) -> Dict[str, float]:
+        """Load the OCR engine and language models in this process ahead of the first job.
+
+        Returns the load time per language in seconds.
+        """
+        return warm_languages(languages or self.settings.supported_languages)
+
+    async def start_up(self, languages: Optional[List[str]] = None, warm: bool = True) -> Dict:
+        """Query the engine's capabilities once and warm every OCR worker.
+
+        ``languages`` defaults to the supported languages that are installed.
+        In process mode each pool worker is warmed. The returned dict (engine,
+        tesseract_version, languages, warmed) is meant to be cached by callers.
+        """
+        start = time.perf_counter()
+        capabilities = await run_in_threadpool(
+            engine_capabilities, self.settings.ocr_engine, self.settings.tessdata_dir
+        )
+        if languages is None:
+            languages = [lang for lang in self.settings.supported_languages if lang in capabilities["languages"]]
+
+        warmed = {}
+        if warm and languages:
+            workers = 1
+            if self.settings.ocr_execution_mode == "process":
+                workers = self.settings.ocr_workers or os.cpu_count() or 1
+            # Submitted together, the tasks make the pool start all of its processes
+            results = await asyncio.gather(*[self._run(warm_languages, languages) for _ in range(workers)])
+            for timings in results:
+                for language, seconds in timings.items():
+                    warmed[language] = max(seconds, warmed.get(language, 0.0))
+
+        capabilities["warmed"] = warmed
+        capabilities["startup_seconds"] = round(time.perf_counter() - start, 3)
+        return capabilities
+
+    async def _run(self, func, *args):
+        """Run CPU-bound work off the event loop using the configured execution engine"""
+        mode = self.settings.ocr_execution_mode
+        if mode == "process":
+            return await run_in_processpool(
+                func, *args,
+                max_workers=self.settings.ocr_workers,
+                initializer=_init_worker,
+                initargs=(self._worker_config,)
+            )
+        if mode == "thread":
+            return await run_in_threadpool(func, *args)
+        return func(*args)
+
+    async def process_file(self, file_content: Optional[bytes], filename: str, 
                           language: str = "eng", file_id: str = None, # type: ignore
-                          confidence_threshold: float = 30.0) -> OCRResult:
-        """Process a file and extract text using OCR"""
+                          confidence_threshold: float = 30.0,
+                          preprocessing: Optional[str] = None,
+                          dpi_mode: Optional[str] = None,
+                          min_dpi: Optional[int] = None,
+                          max_dpi: Optional[int] = None,
+                          compact: bool = False,
+                          pages: Optional[str] = None,
+                          regions: Optional[str] = None,
+                          region_units: str = "pixels",
+                          file_path: Optional[str] = None,
+                          file_hash: Optional[str] = None,
+                          on_page: Optional[Callable[[Dict], None]] = None,
+                          budget: Optional[PageBudget] = None) -> Union[OCRResult, CompactOCRResult]:
+        """Process a file and extract text using OCR.
+
+        With ``compact`` the words come back as parallel arrays
+        (CompactOCRResult) instead of one TextBlock per word. ``pages``
+        ("1-3,7") limits which pages are processed and ``regions`` (a JSON
+        list of [x, y, width, height]) limits OCR to those parts of each page.
+        Instead of ``file_content`` a ``file_path`` may be given; the file is
+        then memory-mapped and read in place. ``file_hash`` (SHA-256) is
+        checked against the content when given. ``on_page`` is called with
+        each page (as yielded by iter_file) as soon as it finishes.
+        ``budget`` is a PageBudget shared with other documents being processed
+        at the same time.
+        """
+        events = self.iter_file(
+            file_content, filename, language, file_id, confidence_threshold,
+            preprocessing=preprocessing, dpi_mode=dpi_mode, min_dpi=min_dpi, max_dpi=max_dpi,
+            compact=compact, pages=pages, regions=regions, region_units=region_units,
+            file_path=file_path, file_hash=file_hash, budget=budget
+        )
+        try:
+            async for event, payload in events:
+                if event == "result":
+                    return payload
+                if on_page is not None:
+                    on_page(payload)
+        finally:
+            # Release the file mapping now rather than when the generator is collected
+            await events.aclose()
+        raise RuntimeError("OCR finished without a result")
+
+    async def iter_file(self, file_content: Optional[bytes], filename: str,
+                        language: str = "eng", file_id: str = None, # type: ignore
+                        confidence_threshold: float = 30.0,
+                        preprocessing: Optional[str] = None,
+                        dpi_mode: Optional[str] = None,
+                        min_dpi: Optional[int] = None,
+                        max_dpi: Optional[int] = None,
+                        compact: bool = False,
+                        pages: Optional[str] = None,
+                        regions: Optional[str] = None,
+                        region_units: str = "pixels",
+                        file_path: Optional[str] = None,
+                        file_hash: Optional[str] = None,
+                        budget: Optional[PageBudget] = None) -> AsyncIterator[Tuple[str, object]]:
+        """Process a file, yielding ("page", page) as each page finishes and ("result", result) last.
+
+        Pages are yielded in page order as dicts with the page number, text,
+        words (WordColumns) and per-page processing info. The result is an
+        OCRResult, or a CompactOCRResult when ``compact`` is set. Page rasters
+        in flight count against ``budget`` when given, else against a budget
+        of this document's own.
+        """
         start_time = time.time()
+        mapped = None
 
         try:
             # Validate language
             if language not in self.settings.supported_languages:
                 raise ValueError(f"Unsupported language: {language}")
 
+            # Validate preprocessing profile
+            preprocessing = preprocessing or self.settings.preprocessing_profile
+            if preprocessing != AUTO and preprocessing not in PROFILES:
+                raise ValueError(f"Unsupported preprocessing profile: {preprocessing}")
+
+            # Resolve rasterization DPI settings
+            render = self._render_options(dpi_mode, min_dpi, max_dpi)
+
+            # Resolve page range and regions of interest
+            selection = {
+                "pages": parse_page_spec(pages),
+                "regions": parse_regions(regions, region_units),
+                "region_units": region_units
+            }
+
             # Determine file type and process accordingly
             file_ext = filename.lower().split('.')[-1]
 
-            if file_ext == 'pdf':
-                pages = await self._process_pdf(file_content)
-            elif file_ext in ['jpg', 'jpeg', 'png', 'tiff', 'tif', 'bmp']:
-                pages = [await self._process_image(file_content)]
-            else:
+            if file_ext not in ['pdf', 'jpg', 'jpeg', 'png', 'tiff', 'tif', 'bmp']:
                 raise ValueError(f"Unsupported file type: {file_ext}")
 
-            # Extract text from all pages
-            text_blocks = []
-            full_text_parts = []
-            confidences = []
+            # Read files on a shared volume in place
+            if file_path is not None:
+                try:
+                    file_content = mapped = await run_in_threadpool(self._map_file, file_path)
+                except OSError as e:
+                    raise FileNotFoundError(f"Cannot read {file_path}: {e.strerror}")
+            file_size = len(file_content)
 
-            for page_num, page_image in enumerate(pages, 1):
-                page_blocks = await self._extract_text_from_image(
-                    page_image, language, page_num, confidence_threshold
+            content_hash = None
+            if self.cache is not None or file_hash:
+                content_hash = await run_in_threadpool(OCRResultCache.content_hash, file_content)
+                if file_hash and content_hash != file_hash.lower():
+                    raise ValueError("File content does not match file_hash")
+
+            # Serve resubmitted documents from the result cache
+            cache_key = None
+            if self.cache is not None:
+                cache_key = OCRResultCache.make_key(
+                    content_hash,
+                    **self._cache_options(file_ext, language, confidence_threshold, preprocessing),
+                    render=render,
+                    selection=selection
                 )
-                text_blocks.extend(page_blocks)
+                cached = await run_in_threadpool(self.cache.get, cache_key)
+                if cached is not None:
+                    result = self._from_cache(cached, filename, file_id, file_size, start_time)
+                    for page in self._cached_pages(result):
+                        yield "page", page
+                    yield "result", result if compact else self._expand(result)
+                    return
 
-                # Collect page text and confidences
-                page_text = "\n".join([block.text for block in page_blocks])
+            # Extract text from pages as they are rendered
+            word_parts = []
+            full_text_parts = []
+            total_pages = 0
+            page_stats = []
+            time_to_first_page = None
+
+            page_inputs = self._iter_pages(file_content, file_ext, render, selection, file_path)
+            async for page_num, page_words, page_info in self._iter_page_results(
+                page_inputs, language, confidence_threshold, preprocessing, selection, budget
+            ):
+                total_pages += 1
+                word_parts.append(page_words)
+                page_stats.append({"page": page_num, **page_info})
+
+                # Collect page text
+                page_text = "\n".join(page_words.text)
                 if page_text.strip():
                     full_text_parts.append(f"--- Page {page_num} ---\n{page_text}")
 
-                page_confidences = [block.confidence for block in page_blocks if block.confidence > 0]
-                confidences.extend(page_confidences)
+                if time_to_first_page is None:
+                    time_to_first_page = round(time.time() - start_time, 2)
 
-            # Calculate overall confidence
-            overall_confidence = sum(confidences) / len(confidences) if confidences else 0.0
+                yield "page", {
+                    "page": page_num,
+                    "text": page_text,
+                    "confidence": page_words.mean_confidence(),
+                    "words": page_words,
+                    "info": page_info
+                }
 
             processing_time = time.time() - start_time
+            words = WordColumns.concat(word_parts)
 
-            return OCRResult(
+            result = CompactOCRResult.model_construct(
                 file_id=file_id,
                 processing_time=round(processing_time, 2),
-                total_pages=len(pages),
+                total_pages=total_pages,
                 language=language,
-                overall_confidence=round(overall_confidence, 2),
-                text_blocks=text_blocks,
+                overall_confidence=words.mean_confidence(),
+                words=words.to_compact(),
                 full_text="\n\n".join(full_text_parts),
                 metadata={
                     "filename": filename,
-                    "file_size": len(file_content),
+                    "file_size": file_size,
                     "confidence_threshold": confidence_threshold,
-                    "total_text_blocks": len(text_blocks)
+                    "preprocessing": preprocessing,
+                    "page_selection": pages,
+                    "regions": selection["regions"],
+                    "total_text_blocks": len(words),
+                    "time_to_first_page": time_to_first_page,
+                    "page_routing": {
+                        source: sum(1 for p in page_stats if p["source"] == source)
+                        for source in ("text_layer", "ocr", "blank", "separator", "duplicate")
+                    },
+                    "pages_skipped": sum(1 for p in page_stats if p["source"] in ("blank", "separator")),
+                    "pages_reused": sum(1 for p in page_stats if p["source"] == "duplicate"),
+                    "pages": page_stats
                 },
                 timestamp=datetime.utcnow().isoformat()
             )
 
+            if cache_key is not None:
+                await run_in_threadpool(self.cache.put, cache_key, result)
+
+            yield "result", result if compact else self._expand(result, words)
+
         except Exception as e:
             logger.error(f"OCR processing failed: {str(e)}")
             raise
+        finally:
+            if isinstance(mapped, mmap.mmap):
+                mapped.close()
+
+    async def extract_form(self, file_content: bytes, filename: str, template_name: str,
+                           language: Optional[str] = None, file_id: str = None, # type: ignore
+                           confidence_threshold: float = 30.0,
+                           pages: Optional[str] = None) -> FormResult:
+        """OCR only the fields of a known form.
+
+        Each selected page is aligned to the template's reference page and
+        each field is cut out as a rectified crop. The crops are OCR'd in
+        parallel. Raises KeyError for an unknown template.
+        """
+        start_time = time.time()
+        template = self.form_templates[template_name]
+        language = language or template.language or "eng"
+        if language not in self.settings.supported_languages:
+            raise ValueError(f"Unsupported language: {language}")
+
+        file_ext = filename.lower().split('.')[-1]
+        if file_ext not in ['pdf', 'jpg', 'jpeg', 'png', 'tiff', 'tif', 'bmp']:
+            raise ValueError(f"Unsupported file type: {file_ext}")
+
+        form_pages = []
+        async for page_num, page in self._form_pages(file_content, file_ext, parse_page_spec(pages)):
+            homography, alignment = await self._run(
+                align_page, page, template, self.settings.form_align_max_side,
+                self.settings.form_align_features, self.settings.form_align_min_inliers
+            )
+            crops = [field_crop(page, homography, field["box"]) for field in template.fields]
+            del page
+            values = await asyncio.gather(*[
+                self._run(ocr_field, crop, language, field["psm"], confidence_threshold)
+                for (crop, _), field in zip(crops, template.fields)
+            ])
+            form_pages.append(FormPage(
+                page=page_num,
+                alignment=alignment,
+                fields={
+                    field["name"]: FormField(box=box, **value)
+                    for field, (_, box), value in zip(template.fields, crops, values)
+                }
+            ))
+
+        fields = {}
+        for form_page in form_pages:
+            for name, field in form_page.fields.items():
+                if field.value and not fields.get(name):
+                    fields[name] = field.value
+        return FormResult(
+            file_id=file_id,
+            template=template.name,
+            processing_time=round(time.time() - start_time, 2),
+            total_pages=len(form_pages),
+            language=language,
+            fields={field["name"]: fields.get(field["name"], "") for field in template.fields},
+            pages=form_pages,
+            timestamp=datetime.utcnow().isoformat()
+        )
+
+    async def _form_pages(self, file_content: bytes, file_ext: str,
+                          page_ranges) -> AsyncIterator[Tuple[int, np.ndarray]]:
+        """Yield (page_num, grayscale image) for the selected pages of a form document"""
+        if file_ext in ('tif', 'tiff'):
+            async for page_num, frame, _ in self._process_tiff(file_content, {"pages": page_ranges}):
+                yield page_num, frame
+            return
+        if file_ext != 'pdf':
+            if not select_pages(page_ranges, 1):
+                raise ValueError("Page selection matches no pages")
+            image, _ = await run_in_threadpool(self._decode_image, file_content)
+            yield 1, image
+            return
+
+        # Form pages are always rendered: field values come from the image, not the text layer
+        with tempfile.NamedTemporaryFile(dir=self.settings.temp_dir, suffix=".pdf") as pdf_file:
+            try:
+                await run_in_threadpool(pdf_file.write, file_content)
+                pdf_file.flush()
+                page_count = await run_in_threadpool(pdf_page_count, pdf_file.name)
+            except Exception as e:
+                logger.error(f"PDF conversion failed: {str(e)}")
+                raise ValueError(f"Failed to process PDF: {str(e)}")
+            page_nums = select_pages(page_ranges, page_count)
+            if not page_nums:
+                raise ValueError(f"Page selection matches no pages (document has {page_count})")
+            for page_num in page_nums:
+                yield page_num, await run_in_threadpool(
+                    render_pdf_page, pdf_file.name, page_num, self.settings.pdf_dpi, True
+                )
+
+    async def iter_batch(self, documents: List[Dict], language: str = "eng",
+                         confidence_threshold: float = 30.0,
+                         preprocessing: Optional[str] = None,
+                         dpi_mode: Optional[str] = None,
+                         min_dpi: Optional[int] = None,
+                         max_dpi: Optional[int] = None,
+                         compact: bool = False,
+                         pages: Optional[str] = None,
+                         regions: Optional[str] = None,
+                         region_units: str = "pixels") -> AsyncIterator[Dict]:
+        """Process many documents at once, yielding a per-file outcome as each one finishes.
+
+        Each document is a dict with ``filename``, an optional ``file_id`` and
+        either ``content`` bytes or a ``path`` to read in place (with an
+        optional ``file_hash``). Up to
+        ``batch_concurrency`` documents are open at a time and all of their
+        pages go through the same worker pool, so small files keep every
+        worker busy instead of running one after another. The documents share
+        one page window and ``max_buffered_page_mb``, so memory stays bounded
+        however many are open. A failing document is reported and does not
+        stop the batch.
+        """
+        semaphore = asyncio.Semaphore(self.settings.batch_concurrency or self._page_window())
+        budget = self._page_budget()
+
+        async def run(index: int, document: Dict) -> Dict:
+            async with semaphore:
+                outcome = {"index": index, "filename": document["filename"], "file_id": document.get("file_id")}
+                try:
+                    outcome["result"] = await self.process_file(
+                        document.get("content"), document["filename"], language, document.get("file_id"),
+                        confidence_threshold, preprocessing=preprocessing, dpi_mode=dpi_mode,
+                        min_dpi=min_dpi, max_dpi=max_dpi, compact=compact,
+                        pages=pages, regions=regions, region_units=region_units,
+                        file_path=document.get("path"), file_hash=document.get("file_hash"),
+                        budget=budget
+                    )
+                    outcome["status"] = "completed"
+                except Exception as e:
+                    logger.error(f"Batch item {document['filename']} failed: {str(e)}")
+                    outcome["status"] = "failed"
+                    outcome["error"] = str(e)
+                return outcome
+
+        tasks = [asyncio.ensure_future(run(i, document)) for i, document in enumerate(documents)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    @staticmethod
+    def _expand(result: CompactOCRResult, words: Optional[WordColumns] = None) -> OCRResult:
+        """Convert a compact result to the per-word OCRResult format"""
+        if words is None:
+            words = WordColumns.from_compact(result.words)
+        fields = {name: getattr(result, name) for name in OCRResult.model_fields if name != "text_blocks"}
+        return OCRResult.model_construct(**fields, text_blocks=words.to_text_blocks())
+
+    def _cached_pages(self, result: CompactOCRResult) -> List[Dict]:
+        """Rebuild per-page events from a cached result"""
+        words = WordColumns.from_compact(result.words)
+        page_stats = {p["page"]: p for p in result.metadata.get("pages", [])}
+        pages = []
+        for page_num in page_stats or range(1, result.total_pages + 1):
+            page_words = words.select(words.page == page_num)
+            info = {k: v for k, v in page_stats.get(page_num, {}).items() if k != "page"}
+            pages.append({
+                "page": page_num,
+                "text": "\n".join(page_words.text),
+                "confidence": page_words.mean_confidence(),
+                "words": page_words,
+                "info": info
+            })
+        return pages
+
+    def _cache_options(self, file_ext: str, language: str, confidence_threshold: float,
+                       preprocessing: str) -> Dict:
+        """Everything besides the file content that changes the OCR output"""
+        return {
+            "file_type": "pdf" if file_ext == "pdf" else "image",
+            "language": language,
+            "confidence_threshold": float(confidence_threshold),
+            "preprocessing": preprocessing,
+            "preprocess_thresholds": [self.settings.preprocess_noise_low, self.settings.preprocess_noise_high,
+                                      self.settings.preprocess_min_contrast],
+            "adaptive_dpi": [self.settings.adaptive_dpi_probe, self.settings.adaptive_dpi_target_x_height],
+            "engine": get_engine(self.settings.ocr_engine, self.settings.tessdata_dir).name,
+            "text_layer": [self.settings.text_layer_min_words, self.settings.text_layer_min_valid_ratio,
+                           self.settings.text_layer_max_image_coverage, self.settings.text_layer_min_line_coverage]
+                          if self.settings.text_layer_enabled else None,
+            "tiling": [self.settings.tile_min_megapixels, self.settings.tile_height,
+                       self.settings.tile_overlap] if self.settings.tiling_enabled else None,
+            "page_filters": [self.settings.blank_max_ink_ratio, self.settings.blank_max_stddev,
+                             self.settings.duplicate_max_hash_distance, self.settings.duplicate_max_ink_diff,
+                             [name for name, _ in self.separator_templates]]
+                            if self.settings.page_filters_enabled else None,
+            "reocr": self._worker_config["reocr"]
+        }
+
+    @staticmethod
+    def _from_cache(cached: CompactOCRResult, filename: str, file_id: str,
+                    file_size: int, start_time: float) -> CompactOCRResult:
+        """Re-label a cached result for the current request"""
+        elapsed = round(time.time() - start_time, 2)
+        return cached.model_copy(update={
+            "file_id": file_id,
+            "processing_time": elapsed,
+            "metadata": {
+                **cached.metadata,
+                "filename": filename,
+                "file_size": file_size,
+                "time_to_first_page": elapsed,
+                "cache": "hit"
+            },
+            "timestamp": datetime.utcnow().isoformat()
+        })
+
+    def _render_options(self, dpi_mode: Optional[str], min_dpi: Optional[int],
+                        max_dpi: Optional[int]) -> Dict:
+        """Resolve per-request rasterization options against the service defaults"""
+        dpi_mode = dpi_mode or self.settings.dpi_mode
+        if dpi_mode not in ("fixed", "adaptive"):
+            raise ValueError(f"Unsupported DPI mode: {dpi_mode}")
+
+        min_dpi = min_dpi or self.settings.min_dpi
+        max_dpi = max_dpi or self.settings.max_dpi
+        if min_dpi > max_dpi:
+            raise ValueError(f"min_dpi ({min_dpi}) is greater than max_dpi ({max_dpi})")
+
+        return {"dpi_mode": dpi_mode, "min_dpi": min_dpi, "max_dpi": max_dpi,
+                "dpi": self.settings.pdf_dpi}
+
+    def _page_window(self) -> int:
+        """Number of pages allowed in flight at once"""
+        return self.settings.page_window or self.settings.ocr_workers or os.cpu_count() or 1
+
+    def _page_budget(self) -> PageBudget:
+        return PageBudget(self._page_window(), self.settings.max_buffered_page_mb * 1024 * 1024)
+
+    async def _iter_pages(self, file_content: bytes, file_ext: str, render: Dict, selection: Dict,
+                          file_path: Optional[str] = None) -> AsyncIterator[Tuple[int, PageInput, Dict]]:
+        """Yield (page_num, page, page_info) one page at a time for the selected pages.
+
+        A page is either an image to OCR or the text blocks already taken from
+        the PDF's embedded text layer.
+        """
+        if file_ext == 'pdf':
+            async for page in self._process_pdf(file_content, render, selection, file_path):
+                yield page
+        elif file_ext in ('tif', 'tiff'):
+            async for page in self._process_tiff(file_content, selection):
+                yield page
+        else:
+            if not select_pages(selection["pages"], 1):
+                raise ValueError("Page selection matches no pages")
+            image, scale = await self._process_image(file_content, render)
+            page_info = {"source": "ocr"}
+            if scale != 1.0:
+                page_info["decode_scale"] = round(scale, 4)
+            yield 1, image, page_info
+
+    async def _iter_page_results(self, pages: AsyncIterator[Tuple[int, PageInput, Dict]], language: str,
+                                 confidence_threshold: float,
+                                 preprocessing: str = AUTO,
+                                 selection: Optional[Dict] = None,
+                                 budget: Optional[PageBudget] = None) -> AsyncIterator[Tuple[int, WordColumns, Dict]]:
+        """OCR pages from a generator within a bounded window, yielding results in page order.
+
+        Each page raster counts against ``budget`` until its OCR finishes.
+        """
+        window = self._page_window()
+        budget = budget or self._page_budget()
+        pending = deque()  # (page_num, task, page_info)
+        loop = asyncio.get_event_loop()
+        page_filter = self._page_filter()
+        ocr_tasks = {}  # page_num -> task, for pages whose results duplicates reuse
 
-    async def _process_pdf(self, pdf_content: bytes) -> List[np.ndarray]:
-        """Convert PDF to images"""
         try:
-            images = convert_from_bytes(pdf_content, dpi=300)
-            return [np.array(img) for img in images]
+            async for page_num, page, page_info in pages:
+                nbytes = page.nbytes if isinstance(page, np.ndarray) else 0
+
+                # Hand back finished pages, and drain the oldest while the window is full
+                while pending and (len(pending) >= window or pending[0][1].done()):
+                    done_num, done_task, done_page_info = pending.popleft()
+                    done_words, done_info = await done_task
+                    yield done_num, done_words, {**done_page_info, **done_info}
+
+                skip, match = None, None
+                if isinstance(page, np.ndarray) and page_filter is not None:
+                    skip, match = await run_in_threadpool(page_filter.check, page, page_num)
+
+                # Wait until the raster fits in the (possibly shared) budget
+                if isinstance(page, np.ndarray):
+                    await budget.acquire(nbytes)
+
+                if skip == "duplicate":
+                    task = asyncio.ensure_future(self._reuse_page(ocr_tasks[match], page_num, match))
+                elif skip is not None:
+                    # Blank and separator pages produce no words
+                    task = loop.create_future()
+                    info = {"source": skip}
+                    if match is not None:
+                        info["template"] = match
+                    task.set_result((WordColumns.empty(), info))
+                elif isinstance(page, np.ndarray):
+                    # Report boxes at the reference DPI whatever the page was rendered at,
+                    # and image boxes in the file's pixels if it was decoded at reduced size
+                    if "dpi" in page_info:
+                        bbox_scale = self.settings.pdf_dpi / page_info["dpi"]
+                    else:
+                        bbox_scale = page_info.get("decode_scale", 1.0)
+                    regions = (selection or {}).get("regions")
+                    if regions is None and self._should_tile(page):
+                        task = asyncio.ensure_future(self._extract_text_tiled(
+                            page, language, page_num, confidence_threshold, preprocessing, bbox_scale
+                        ))
+                    else:
+                        task = asyncio.ensure_future(self._extract_text_from_image(
+                            page, language, page_num, confidence_threshold, preprocessing, bbox_scale,
+                            regions, (selection or {}).get("region_units", "pixels")
+                        ))
+                    if page_filter is not None:
+                        ocr_tasks[page_num] = task
+                else:
+                    # Text-layer pages are already done; keep them in order with OCR'd pages
+                    task = loop.create_future()
+                    task.set_result((page, {}))
+
+                if isinstance(page, np.ndarray):
+                    task.add_done_callback(lambda _, nbytes=nbytes: budget.release(nbytes))
+                pending.append((page_num, task, page_info))
+                del page
+
+            while pending:
+                done_num, done_task, done_page_info = pending.popleft()
+                done_words, done_info = await done_task
+                yield done_num, done_words, {**done_page_info, **done_info}
+        finally:
+            for _, task, _ in pending:
+                task.cancel()
+
+    def _page_filter(self) -> Optional[PageFilter]:
+        """Fresh blank/separator/duplicate page filter for one document"""
+        if not self.settings.page_filters_enabled:
+            return None
+        return PageFilter(
+            self.separator_templates,
+            max_ink_ratio=self.settings.blank_max_ink_ratio,
+            max_stddev=self.settings.blank_max_stddev,
+            max_distance=self.settings.duplicate_max_hash_distance,
+            max_diff=self.settings.duplicate_max_ink_diff
+        )
+
+    @staticmethod
+    async def _reuse_page(original: asyncio.Future, page_num: int, original_num: int) -> Tuple[WordColumns, Dict]:
+        """Copy the words of an earlier identical page onto this one"""
+        words, _ = await asyncio.shield(original)
+        copy = WordColumns.for_page(
+            list(words.text), words.confidence.copy(), words.bbox.copy(), page_num, words.line.copy()
+        )
+        return copy, {"source": "duplicate", "duplicate_of": original_num}
+
+    async def _process_pdf(self, pdf_content: bytes, render: Dict, selection: Dict,
+                           pdf_path: Optional[str] = None) -> AsyncIterator[Tuple[int, PageInput, Dict]]:
+        """Render the selected PDF pages to images one at a time, using the text layer where it is usable"""
+        if pdf_path is not None:
+            # Files already on disk are rendered in place instead of being copied to a temp file
+            async for page in self._process_pdf_file(pdf_path, render, selection):
+                yield page
+            return
+
+        with tempfile.NamedTemporaryFile(dir=self.settings.temp_dir, suffix=".pdf") as pdf_file:
+            try:
+                pdf_file.write(pdf_content)
+                pdf_file.flush()
+            except Exception as e:
+                logger.error(f"PDF conversion failed: {str(e)}")
+                raise ValueError(f"Failed to process PDF: {str(e)}")
+
+            async for page in self._process_pdf_file(pdf_file.name, render, selection):
+                yield page
+
+    async def _process_pdf_file(self, pdf_path: str, render: Dict,
+                                selection: Dict) -> AsyncIterator[Tuple[int, PageInput, Dict]]:
+        try:
+            page_count = await run_in_threadpool(pdf_page_count, pdf_path)
         except Exception as e:
             logger.error(f"PDF conversion failed: {str(e)}")
             raise ValueError(f"Failed to process PDF: {str(e)}")
 
-    async def _process_image(self, image_content: bytes) -> np.ndarray:
-        """Process image file"""
+        page_nums = select_pages(selection["pages"], page_count)
+        if not page_nums:
+            raise ValueError(f"Page selection matches no pages (document has {page_count})")
+
+        doc = None
+        if self.settings.text_layer_enabled:
+            doc = await run_in_threadpool(open_document, pdf_path)
+
         try:
-            # Convert bytes to PIL Image
-            image = Image.open(io.BytesIO(image_content))
+            for page_num in page_nums:
+                # Born-digital pages skip rasterization and OCR entirely
+                if doc is not None:
+                    native_words = await run_in_threadpool(self._native_page_words, doc, page_num, selection)
+                    if native_words is not None:
+                        yield page_num, native_words, {"source": "text_layer"}
+                        continue
 
-            # Convert to RGB if necessary
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
+                try:
+                    page_info = await run_in_threadpool(self._page_dpi, pdf_path, page_num, render)
+                    image = await run_in_threadpool(
+                        render_pdf_page, pdf_path, page_num, page_info["dpi"], True
+                    )
+                except Exception as e:
+                    logger.error(f"PDF conversion failed on page {page_num}: {str(e)}")
+                    raise ValueError(f"Failed to process PDF: {str(e)}")
+                yield page_num, image, page_info
+        finally:
+            if doc is not None:
+                doc.close()
 
-            return np.array(image)
+    def _page_dpi(self, pdf_path: str, page_num: int, render: Dict) -> Dict:
+        """Choose the render DPI for an image-only page"""
+        if render["dpi_mode"] != "adaptive":
+            dpi = max(render["min_dpi"], min(render["max_dpi"], render["dpi"]))
+            return {"source": "ocr", "dpi": dpi}
+
+        dpi, x_height = choose_pdf_dpi(
+            pdf_path, page_num,
+            probe_dpi=self.settings.adaptive_dpi_probe,
+            target_x_height=self.settings.adaptive_dpi_target_x_height,
+            min_dpi=render["min_dpi"],
+            max_dpi=render["max_dpi"],
+            default_dpi=render["dpi"]
+        )
+        return {"source": "ocr", "dpi": dpi, "probe_x_height": x_height}
+
+    def _native_page_words(self, doc, page_num: int, selection: Dict) -> Optional[WordColumns]:
+        """Words from the PDF text layer, or None if the page must be OCR'd"""
+        try:
+            words = extract_page_words(
+                doc, page_num, self.settings.pdf_dpi,
+                min_words=self.settings.text_layer_min_words,
+                min_valid_ratio=self.settings.text_layer_min_valid_ratio,
+                max_image_coverage=self.settings.text_layer_max_image_coverage,
+                min_line_coverage=self.settings.text_layer_min_line_coverage
+            )
+        except Exception as e:
+            logger.warning(f"Text layer extraction failed on page {page_num}, using OCR: {str(e)}")
+            return None
+
+        if words is not None and selection["regions"]:
+            # Keep only the words inside the regions of interest
+            width, height = page_size(doc, page_num, self.settings.pdf_dpi)
+            boxes = to_pixel_boxes(selection["regions"], selection["region_units"], width, height)
+            words = words.select(words_in_regions(words.bbox, boxes))
+        return words
+
+    async def _process_image(self, image_content: bytes, render: Dict) -> Tuple[np.ndarray, float]:
+        """Decode an image file to grayscale, returning (image, scale back to file pixels)"""
+        try:
+            return await run_in_threadpool(self._decode_image, image_content, render["max_dpi"])
         except Exception as e:
             logger.error(f"Image processing failed: {str(e)}")
             raise ValueError(f"Failed to process image: {str(e)}")
 
-    async def _extract_text_from_image(self, image: np.ndarray, language: str, 
-                                     page_num: int, confidence_threshold: float) -> List[TextBlock]:
-        """Extract text from image using Tesseract"""
+    async def _process_tiff(self, tiff_content: bytes, selection: Dict) -> AsyncIterator[Tuple[int, PageInput, Dict]]:
+        """Decode a (possibly multi-page) TIFF one frame at a time"""
         try:
-            # Preprocess image for better OCR
-            processed_image = await self._preprocess_image(image)
-
-            # Get detailed OCR data
-            ocr_data = pytesseract.image_to_data(
-                processed_image,
-                lang=language,
-                output_type=pytesseract.Output.DICT
-            )
+            image = await run_in_threadpool(Image.open, self._as_file(tiff_content))
+        except Exception as e:
+            logger.error(f"Image processing failed: {str(e)}")
+            raise ValueError(f"Failed to process image: {str(e)}")
+
+        try:
+            frame_count = getattr(image, "n_frames", 1)
+            page_nums = select_pages(selection["pages"], frame_count)
+            if not page_nums:
+                raise ValueError(f"Page selection matches no pages (document has {frame_count})")
 
-            text_blocks = []
-            n_boxes = len(ocr_data['text'])
+            for page_num in page_nums:
+                try:
+                    frame = await run_in_threadpool(self._decode_frame, image, page_num - 1)
+                except Exception as e:
+                    logger.error(f"TIFF decoding failed on page {page_num}: {str(e)}")
+                    raise ValueError(f"Failed to process image: {str(e)}")
+                yield page_num, frame, {"source": "ocr"}
+        finally:
+            image.close()
 
-            for i in range(n_boxes):
-                confidence = float(ocr_data['conf'][i])
-                text = ocr_data['text'][i].strip()
+    @staticmethod
+    def _as_file(content) -> io.IOBase:
+        """File-like view of the content; memory-mapped files are read in place rather than copied"""
+        if isinstance(content, mmap.mmap):
+            content.seek(0)
+            return content
+        return io.BytesIO(content)
 
-                # Filter by confidence and non-empty text
-                if confidence >= confidence_threshold and text:
-                    bbox = [
-                        int(ocr_data['left'][i]),
-                        int(ocr_data['top'][i]),
-                        int(ocr_data['width'][i]),
-                        int(ocr_data['height'][i])
-                    ]
+    @staticmethod
+    def _map_file(path: str):
+        """Memory-map a file read-only so pages are read on demand instead of copied into memory"""
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b""
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
 
-                    text_blocks.append(TextBlock(
-                        text=text,
-                        confidence=round(confidence, 2),
-                        bbox=bbox,
-                        page=page_num
-                    ))
+    @staticmethod
+    def _decode_frame(image: Image.Image, index: int) -> np.ndarray:
+        """Decode one frame of a multi-frame image into a grayscale array"""
+        # Seeking only reads the requested frame, so earlier frames are not kept in memory
+        image.seek(index)
+        return to_gray_array(image)
 
-            return text_blocks
+    @staticmethod
+    def _decode_image(image_content: bytes, max_dpi: Optional[int] = None) -> Tuple[np.ndarray, float]:
+        """Decode image bytes into a grayscale array, returning (image, scale back to file pixels)"""
+        return decode_gray(OCRProcessor._as_file(image_content), max_dpi)
+
+    async def _extract_text_from_image(self, image: np.ndarray, language: str, page_num: int,
+                                       confidence_threshold: float, preprocessing: str = AUTO,
+                                       bbox_scale: float = 1.0, regions: Optional[List[List[float]]] = None,
+                                       region_units: str = "pixels") -> Tuple[WordColumns, Dict]:
+        """Extract text from image using Tesseract"""
+        try:
+            return await self._run(
+                ocr_page, image, language, page_num, confidence_threshold, preprocessing, bbox_scale,
+                regions, region_units
+            )
 
         except Exception as e:
             logger.error(f"Text extraction failed: {str(e)}")
             raise
 
-    async def _preprocess_image(self, image: np.ndarray) -> np.ndarray:
-        """Preprocess image for better OCR results"""
-        try:
-            # Convert to grayscale
-            if len(image.shape) == 3:
-                gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
-            else:
-                gray = image
-
-            # Apply denoising
-            denoised = cv2.fastNlMeansDenoising(gray)
-
-            # Apply adaptive thresholding
-            thresh = cv2.adaptiveThreshold(
-                denoised, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                cv2.THRESH_BINARY, 11, 2
-            )
+    def _should_tile(self, image: np.ndarray) -> bool:
+        """Whether an image is large enough to OCR as parallel strips"""
+        if not self.settings.tiling_enabled:
+            return False
+        height, width = image.shape[:2]
+        return (height * width > self.settings.tile_min_megapixels * 1_000_000
+                and height > self.settings.tile_height)
 
-            return thresh
+    async def _extract_text_tiled(self, image: np.ndarray, language: str, page_num: int,
+                                  confidence_threshold: float, preprocessing: str = AUTO,
+                                  bbox_scale: float = 1.0) -> Tuple[WordColumns, Dict]:
+        """OCR an oversized image as overlapping horizontal strips in parallel"""
+        strips = strip_bounds(image.shape[0], self.settings.tile_height, self.settings.tile_overlap)
+        results = await asyncio.gather(*[
+            self._extract_text_from_image(image[top:bottom], language, page_num,
+                                          confidence_threshold, preprocessing)
+            for top, bottom, _, _ in strips
+        ])
 
-        except Exception as e:
-            logger.warning(f"Image preprocessing failed, using original: {str(e)}")
-            return image
+        words = merge_strips([
+            (strip_words, top, own_top, own_bottom)
+            for (strip_words, _), (top, _, own_top, own_bottom) in zip(results, strips)
+        ])
+        words = scale_boxes(words, bbox_scale)
+
+        tiles = [
+            {"rows": [top, bottom], "preprocessing": info.get("preprocessing"),
+             "preprocessing_ms": info.get("preprocessing_ms", 0)}
+            for (_, info), (top, bottom, _, _) in zip(results, strips)
+        ]
+        page_info = {
+            "tiles": tiles,
+            "preprocessing_ms": round(sum(tile["preprocessing_ms"] for tile in tiles), 1),
+            "words_detected": sum(info.get("words_detected", 0) for _, info in results),
+            "words_kept": len(words)
+        }
+        return words, page_info
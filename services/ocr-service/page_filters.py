@@ -0,0 +1,159 @@
+# page_filters.py
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+import cv2 # type: ignore
+import numpy as np # type: ignore
+from decode import decode_gray
+from preprocessing import to_gray
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_SIZE = 256
+# The inked area is compared at this size, so small text stays legible
+INK_SIZE = 768
+# Pixels this much darker than the paper count as ink
+INK_DELTA = 40
+# Hash cells closer than this in brightness are too close to call under scan noise
+HASH_MARGIN = 2
+
+
+def page_signature(gray: np.ndarray) -> Dict:
+    """Ink statistics, difference hash and ink mask of a grayscale page.
+
+    Statistics and hash come from a fixed-size area-averaged thumbnail. The
+    ink mask covers only the page's inked bounding box, rescaled to
+    INK_SIZE square and bit-packed, so sparse pages are compared on their
+    text rather than on the paper around it.
+    """
+    gray = to_gray(gray)
+    height, width = gray.shape[:2]
+    thumb = cv2.resize(gray, (THUMBNAIL_SIZE, THUMBNAIL_SIZE), interpolation=cv2.INTER_AREA)
+    paper = np.percentile(thumb, 95)
+    small = cv2.resize(thumb, (17, 16), interpolation=cv2.INTER_AREA).astype(np.int16)
+    signature = {
+        "aspect": width / height,
+        "ink_ratio": float(np.count_nonzero(thumb < paper - INK_DELTA)) / thumb.size,
+        "stddev": float(thumb.std()),
+        # 256-cell difference hash, kept as signed differences so that
+        # near-equal cells (blank paper) can be left out of comparisons
+        "hash": small[:, 1:] - small[:, :-1],
+        "ink_box": None,
+        "ink": None
+    }
+
+    ink = thumb < paper - INK_DELTA
+    rows, cols = np.flatnonzero(ink.any(axis=1)), np.flatnonzero(ink.any(axis=0))
+    if rows.size:
+        # Thumbnail cells back to page pixels with a cell of margin, then
+        # tightened to the inked pixels so the box does not depend on where
+        # the cell boundaries fall
+        y0 = max(0, (rows[0] - 1) * height // THUMBNAIL_SIZE)
+        y1 = min(height, (rows[-1] + 2) * height // THUMBNAIL_SIZE)
+        x0 = max(0, (cols[0] - 1) * width // THUMBNAIL_SIZE)
+        x1 = min(width, (cols[-1] + 2) * width // THUMBNAIL_SIZE)
+        ink = gray[y0:y1, x0:x1] < paper - INK_DELTA
+        rows, cols = np.flatnonzero(ink.any(axis=1)), np.flatnonzero(ink.any(axis=0))
+        y0, y1, x0, x1 = y0 + rows[0], y0 + rows[-1] + 1, x0 + cols[0], x0 + cols[-1] + 1
+        crop = gray[y0:y1, x0:x1]
+        interpolation = cv2.INTER_AREA if crop.size > INK_SIZE * INK_SIZE else cv2.INTER_LINEAR
+        crop = cv2.resize(crop, (INK_SIZE, INK_SIZE), interpolation=interpolation)
+        signature["ink_box"] = (x0 / width, y0 / height, x1 / width, y1 / height)
+        signature["ink"] = np.packbits(crop < paper - INK_DELTA)
+    return signature
+
+
+def hash_distance(a: np.ndarray, b: np.ndarray) -> int:
+    """Number of hash cells where both pages have a clear gradient and they disagree"""
+    confident = (np.abs(a) >= HASH_MARGIN) & (np.abs(b) >= HASH_MARGIN)
+    return int(np.count_nonzero(((a > 0) != (b > 0)) & confident))
+
+
+def ink_difference(a: np.ndarray, b: np.ndarray) -> float:
+    """Fraction of the two pages' ink pixels that the other page has no ink near.
+
+    A pixel of slack absorbs scan and resampling jitter; anything more, such
+    as a changed digit, counts in full against the ink actually present.
+    """
+    a = np.unpackbits(a).reshape(INK_SIZE, INK_SIZE)
+    b = np.unpackbits(b).reshape(INK_SIZE, INK_SIZE)
+    total = int(np.count_nonzero(a)) + int(np.count_nonzero(b))
+    if not total:
+        return 0.0
+    kernel = np.ones((3, 3), np.uint8)
+    missing = np.count_nonzero(a & ~cv2.dilate(b, kernel)) + np.count_nonzero(b & ~cv2.dilate(a, kernel))
+    return missing / total
+
+
+def is_blank(signature: Dict, max_ink_ratio: float, max_stddev: float) -> bool:
+    """A page is blank if it is nearly uniform or has almost no ink"""
+    return signature["stddev"] <= max_stddev or signature["ink_ratio"] <= max_ink_ratio
+
+
+def same_page(a: Dict, b: Dict, max_distance: int, max_diff: float) -> bool:
+    """Whether two signatures show the same page.
+
+    The hash only screens out clearly different pages, since text pages with
+    the same layout hash alike. The inked areas must then sit in the same
+    place and match pixel for pixel, within ``max_diff`` of their ink.
+    """
+    if abs(a["aspect"] - b["aspect"]) > 0.03 * max(a["aspect"], b["aspect"]):
+        return False
+    if hash_distance(a["hash"], b["hash"]) > max_distance:
+        return False
+    if a["ink"] is None or b["ink"] is None:
+        return a["ink"] is None and b["ink"] is None
+    if max(abs(p - q) for p, q in zip(a["ink_box"], b["ink_box"])) > 2.0 / THUMBNAIL_SIZE:
+        return False
+    return ink_difference(a["ink"], b["ink"]) <= max_diff
+
+
+def load_templates(template_dir: str) -> List[Tuple[str, Dict]]:
+    """Signatures of the separator sheet images in ``template_dir``"""
+    templates = []
+    if not template_dir or not os.path.isdir(template_dir):
+        return templates
+    for name in sorted(os.listdir(template_dir)):
+        path = os.path.join(template_dir, name)
+        if not os.path.isfile(path):
+            continue
+        try:
+            gray, _ = decode_gray(path)
+            templates.append((name, page_signature(gray)))
+        except Exception as e:
+            logger.warning(f"Skipping separator template {name}: {str(e)}")
+    logger.info(f"Loaded {len(templates)} separator templates from {template_dir}")
+    return templates
+
+
+class PageFilter:
+    """Decides, per document, which image pages need OCR.
+
+    ``check`` returns ("blank", None), ("separator", template name),
+    ("duplicate", earlier page number) or (None, None) for a page to OCR,
+    which is then remembered for later duplicates.
+    """
+
+    def __init__(self, templates: List[Tuple[str, Dict]], max_ink_ratio: float,
+                 max_stddev: float, max_distance: int, max_diff: float, max_remembered: int = 256):
+        self.templates = templates
+        self.max_ink_ratio = max_ink_ratio
+        self.max_stddev = max_stddev
+        self.max_distance = max_distance
+        self.max_diff = max_diff
+        self.max_remembered = max_remembered
+        self.seen = []  # (page_num, signature) of pages sent to OCR
+
+    def check(self, page: np.ndarray, page_num: int) -> Tuple[Optional[str], Optional[object]]:
+        signature = page_signature(page)
+        if is_blank(signature, self.max_ink_ratio, self.max_stddev):
+            return "blank", None
+        for name, template in self.templates:
+            if same_page(signature, template, self.max_distance, self.max_diff):
+                return "separator", name
+        for seen_num, seen in self.seen:
+            if same_page(signature, seen, self.max_distance, self.max_diff):
+                return "duplicate", seen_num
+        if len(self.seen) < self.max_remembered:
+            self.seen.append((page_num, signature))
+        return None, None
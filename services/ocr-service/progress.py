@@ -0,0 +1,126 @@
+# progress.py
+import json
+import logging
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def partial_key(job_id: str) -> str:
+    """Redis list holding a job's partial page results, one JSON item per page"""
+    return f"ocr:partial:{job_id}"
+
+
+def read_partial(connection, job_id: str) -> List[Dict]:
+    return [json.loads(item) for item in connection.lrange(partial_key(job_id), 0, -1)]
+
+
+class JobProgress:
+    """Publishes a queued job's progress into its RQ metadata.
+
+    Tracks units done (pages, or files for batch jobs) and an exponential
+    moving average of seconds per unit. Without an RQ job (e.g. when called
+    inline) it only keeps the counters.
+
+    With ``keep_partial`` each step's partial result is appended to a Redis
+    list next to the job (see ``partial_key``) that expires ``partial_ttl``
+    seconds after the last append, so each page is written once rather than
+    rewriting the metadata with every page so far.
+    """
+
+    def __init__(self, job, total: Optional[int], unit: str = "pages",
+                 alpha: float = 0.3, keep_partial: bool = False, partial_ttl: int = 3600):
+        self.job = job
+        self.unit = unit
+        self.total = total
+        self.alpha = alpha
+        self.keep_partial = keep_partial
+        self.partial_ttl = partial_ttl
+        self.done = 0
+        self.seconds_per_unit = None
+        self.started_at = self.updated_at = time.time()
+        self._publish()
+
+    def step(self, partial: Optional[Dict] = None):
+        """Record one finished unit, with an optional partial result to expose"""
+        now = time.time()
+        elapsed = now - self.updated_at
+        if self.seconds_per_unit is None:
+            self.seconds_per_unit = elapsed
+        else:
+            self.seconds_per_unit += self.alpha * (elapsed - self.seconds_per_unit)
+        self.done += 1
+        self.updated_at = now
+        if self.keep_partial and partial is not None:
+            self._append_partial(partial)
+        self._publish()
+
+    def snapshot(self) -> Dict:
+        return {
+            "unit": self.unit,
+            "done": self.done,
+            "total": self.total,
+            "seconds_per_unit": round(self.seconds_per_unit, 3) if self.seconds_per_unit is not None else None,
+            "started_at": self.started_at,
+            "updated_at": self.updated_at
+        }
+
+    def _publish(self):
+        if self.job is None:
+            return
+        self.job.meta["progress"] = self.snapshot()
+        try:
+            self.job.save_meta()
+        except Exception as e:
+            # Progress is advisory; never fail the job over it
+            logger.warning(f"Failed to publish progress for job {self.job.id}: {str(e)}")
+
+    def _append_partial(self, partial: Dict):
+        if self.job is None:
+            return
+        key = partial_key(self.job.id)
+        try:
+            pipeline = self.job.connection.pipeline()
+            pipeline.rpush(key, json.dumps(partial))
+            pipeline.expire(key, self.partial_ttl)
+            pipeline.execute()
+        except Exception as e:
+            logger.warning(f"Failed to publish partial result for job {self.job.id}: {str(e)}")
+
+
+def describe_progress(progress: Optional[Dict], status: str, min_poll: float, max_poll: float,
+                      now: Optional[float] = None) -> Dict:
+    """Progress, ETA and a suggested polling interval for a job's status response"""
+    if status in ("finished", "failed", "canceled", "stopped"):
+        return {"progress": progress, "eta_seconds": None, "poll_after": None}
+    if not progress:
+        # Not started yet: nothing to estimate from, so poll at the slow end
+        return {"progress": None, "eta_seconds": None, "poll_after": max_poll}
+
+    now = time.time() if now is None else now
+    since_update = max(0.0, now - progress["updated_at"])
+    per_unit = progress.get("seconds_per_unit")
+    total = progress.get("total")
+
+    eta = None
+    if per_unit is not None and total is not None:
+        remaining = max(0, total - progress["done"])
+        eta = round(max(0.0, remaining * per_unit - since_update), 1)
+
+    if per_unit is None:
+        poll_after = min_poll
+    else:
+        # Poll about once per unit, sooner if the job should finish first
+        poll_after = per_unit if eta is None else min(per_unit, max(eta, min_poll))
+    poll_after = round(min(max(poll_after, min_poll), max_poll), 1)
+
+    return {
+        "progress": {
+            **progress,
+            "percent": round(100.0 * progress["done"] / total, 1) if total else None,
+            "seconds_since_update": round(since_update, 1)
+        },
+        "eta_seconds": eta,
+        "poll_after": poll_after
+    }
@@ -0,0 +1,61 @@
+# rasterizer.py
+from typing import Optional, Tuple
+import cv2 # type: ignore
+import numpy as np # type: ignore
+from pdf2image import convert_from_path, pdfinfo_from_path # type: ignore
+
+
+def pdf_page_count(pdf_path: str) -> int:
+    """Return the number of pages in a PDF without rendering it"""
+    info = pdfinfo_from_path(pdf_path)
+    return int(info["Pages"])
+
+
+def render_pdf_page(pdf_path: str, page_num: int, dpi: int = 300, grayscale: bool = False) -> np.ndarray:
+    """Render a single PDF page (1-based) to a read-only array, copying the pixels once"""
+    images = convert_from_path(
+        pdf_path, dpi=dpi, first_page=page_num, last_page=page_num, grayscale=grayscale
+    )
+    if not images:
+        raise ValueError(f"Page {page_num} could not be rendered")
+    return np.asarray(images[0])
+
+
+def estimate_x_height(gray: np.ndarray, min_components: int = 20) -> Optional[float]:
+    """Estimate the typical glyph height in pixels from connected components.
+
+    Returns None when the page has too little text to measure.
+    """
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    _, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    widths = stats[1:, cv2.CC_STAT_WIDTH]
+    areas = stats[1:, cv2.CC_STAT_AREA]
+
+    # Keep glyph-sized components: drop specks, rules, and image regions
+    keep = (
+        (heights >= 2)
+        & (heights <= gray.shape[0] * 0.05)
+        & (widths <= heights * 3)
+        & (areas >= 3)
+    )
+    if int(keep.sum()) < min_components:
+        return None
+    return float(np.median(heights[keep]))
+
+
+def choose_pdf_dpi(pdf_path: str, page_num: int, probe_dpi: int, target_x_height: float,
+                   min_dpi: int, max_dpi: int, default_dpi: int) -> Tuple[int, Optional[float]]:
+    """Pick the lowest DPI that renders the page's text at the target glyph height.
+
+    A low-resolution grayscale probe is rendered and measured; pages without
+    measurable text fall back to ``default_dpi``. Returns (dpi, probe glyph height).
+    """
+    probe = render_pdf_page(pdf_path, page_num, probe_dpi, grayscale=True)
+    x_height = estimate_x_height(probe)
+    if x_height is None:
+        dpi = default_dpi
+    else:
+        dpi = int(round(probe_dpi * target_x_height / x_height / 10.0)) * 10
+    return max(min_dpi, min(max_dpi, dpi)), x_height
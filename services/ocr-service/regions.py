@@ -0,0 +1,90 @@
+# regions.py
+import json
+from typing import List, Optional, Tuple
+import numpy as np # type: ignore
+
+# Units for regions of interest: pixels at the document's reference resolution,
+# or fractions of the page width/height
+REGION_UNITS = ["pixels", "normalized"]
+
+
+def parse_page_spec(spec: Optional[str]) -> Optional[List[Tuple[int, Optional[int]]]]:
+    """Parse a page selection like "1-3,7,10-" into (first, last) ranges; last None = to the end"""
+    if not spec or not spec.strip():
+        return None
+    ranges = []
+    for part in spec.split(","):
+        part = part.strip()
+        try:
+            if "-" in part:
+                first, last = part.split("-", 1)
+                ranges.append((int(first), int(last) if last.strip() else None))
+            else:
+                ranges.append((int(part), int(part)))
+        except ValueError:
+            raise ValueError(f"Invalid page selection: {spec}")
+    for first, last in ranges:
+        if first < 1 or (last is not None and last < first):
+            raise ValueError(f"Invalid page selection: {spec}")
+    return ranges
+
+
+def select_pages(ranges: Optional[List[Tuple[int, Optional[int]]]], page_count: int) -> List[int]:
+    """Page numbers of a document that fall in the selected ranges, in order"""
+    if ranges is None:
+        return list(range(1, page_count + 1))
+    selected = set()
+    for first, last in ranges:
+        selected.update(range(first, min(last or page_count, page_count) + 1))
+    return sorted(selected)
+
+
+def parse_regions(spec: Optional[str], units: str = "pixels") -> Optional[List[List[float]]]:
+    """Parse a JSON list of [x, y, width, height] regions"""
+    if not spec:
+        return None
+    if units not in REGION_UNITS:
+        raise ValueError(f"Unsupported region units: {units}")
+    try:
+        regions = json.loads(spec)
+    except ValueError:
+        raise ValueError("regions must be a JSON list of [x, y, width, height]")
+
+    if not isinstance(regions, list) or not regions:
+        raise ValueError("regions must be a JSON list of [x, y, width, height]")
+    for region in regions:
+        if (not isinstance(region, list) or len(region) != 4
+                or not all(isinstance(v, (int, float)) for v in region)):
+            raise ValueError("regions must be a JSON list of [x, y, width, height]")
+        if region[2] <= 0 or region[3] <= 0:
+            raise ValueError(f"Region has no area: {region}")
+        if units == "normalized" and not all(0 <= v <= 1 for v in region):
+            raise ValueError(f"Normalized region outside [0, 1]: {region}")
+    return [[float(v) for v in region] for region in regions]
+
+
+def to_pixel_boxes(regions: List[List[float]], units: str, width: int, height: int,
+                   scale: float = 1.0) -> np.ndarray:
+    """Regions as (x0, y0, x1, y1) pixel boxes on a width x height page, clipped to the page.
+
+    ``scale`` converts reference-resolution pixels to the page's pixels.
+    """
+    boxes = np.array(regions, dtype=np.float64).reshape(-1, 4)
+    if units == "normalized":
+        boxes *= [width, height, width, height]
+    else:
+        boxes *= scale
+    boxes[:, 2:] += boxes[:, :2]
+    boxes = np.rint(boxes).astype(np.int64)
+    boxes[:, [0, 2]] = np.clip(boxes[:, [0, 2]], 0, width)
+    boxes[:, [1, 3]] = np.clip(boxes[:, [1, 3]], 0, height)
+    return boxes[(boxes[:, 2] > boxes[:, 0]) & (boxes[:, 3] > boxes[:, 1])]
+
+
+def words_in_regions(bbox: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+    """Mask of words ([x, y, w, h]) whose centre falls inside any (x0, y0, x1, y1) box"""
+    cx = bbox[:, 0] + bbox[:, 2] / 2.0
+    cy = bbox[:, 1] + bbox[:, 3] / 2.0
+    inside = ((cx[:, None] >= boxes[:, 0]) & (cx[:, None] < boxes[:, 2]) &
+              (cy[:, None] >= boxes[:, 1]) & (cy[:, None] < boxes[:, 3]))
+    return inside.any(axis=1)
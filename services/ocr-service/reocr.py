@@ -0,0 +1,109 @@
+# reocr.py
+import time
+from typing import Callable, Dict, List, Tuple
+import cv2 # type: ignore
+import numpy as np # type: ignore
+from tsv import word_mask
+
+# Line crops are upscaled so their text is at least this many pixels tall
+MIN_LINE_HEIGHT = 40
+MAX_UPSCALE = 3.0
+
+
+def weak_lines(words: Dict, target: float, max_lines: int) -> List[np.ndarray]:
+    """Word indices of each line whose mean confidence is below ``target``, weakest first"""
+    valid = np.flatnonzero(word_mask(words, 0.0))
+    if not valid.size:
+        return []
+    keys = np.stack([words["block_num"][valid], words["par_num"][valid], words["line_num"][valid]], axis=1)
+    _, line_of, counts = np.unique(keys, axis=0, return_inverse=True, return_counts=True)
+    line_of = line_of.reshape(-1)
+    means = np.bincount(line_of, weights=words["conf"][valid]) / counts
+
+    weak = np.flatnonzero(means < target)
+    weak = weak[np.argsort(means[weak], kind="stable")][:max_lines]
+    return [valid[line_of == line] for line in weak]
+
+
+def _line_crop(image: np.ndarray, bbox: np.ndarray) -> Tuple[np.ndarray, int, int, float]:
+    """Padded crop around a line's word boxes, upscaled if its text is small"""
+    height, width = image.shape[:2]
+    x0, y0 = bbox[:, 0].min(), bbox[:, 1].min()
+    x1, y1 = (bbox[:, 0] + bbox[:, 2]).max(), (bbox[:, 1] + bbox[:, 3]).max()
+    pad = max(4, int((y1 - y0) * 0.3))
+    x0, y0 = max(0, x0 - pad), max(0, y0 - pad)
+    x1, y1 = min(width, x1 + pad), min(height, y1 + pad)
+    crop = image[y0:y1, x0:x1]
+
+    scale = min(MAX_UPSCALE, MIN_LINE_HEIGHT / max(1, bbox[:, 3].max()))
+    if scale > 1.0:
+        crop = cv2.resize(crop, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+    else:
+        scale = 1.0
+    return crop, int(x0), int(y0), scale
+
+
+def _mean_confidence(words: Dict, indices: np.ndarray = None) -> float:
+    conf = words["conf"] if indices is None else words["conf"][indices]
+    return float(conf.mean()) if conf.size else -1.0
+
+
+def reocr_weak_lines(image: np.ndarray, words: Dict, ocr: Callable[[np.ndarray], Dict],
+                     target: float, max_lines: int, min_gain: float) -> Tuple[Dict, Dict]:
+    """Re-OCR the lines whose mean confidence is below ``target`` and merge the better reads.
+
+    ``ocr`` runs the second-pass pipeline on a line crop and returns parsed
+    TSV columns. A line's words are replaced when the new read's mean
+    confidence beats the old one by at least ``min_gain``; the new words keep
+    the line's block/paragraph/line numbers. Work is proportional to the
+    number of weak lines (at most ``max_lines``), not to the page size.
+    """
+    start = time.perf_counter()
+    lines = weak_lines(words, target, max_lines)
+    info = {"lines_checked": len(lines), "lines_improved": 0}
+    if not lines:
+        return words, info
+
+    drop = []
+    additions = []
+    for indices in lines:
+        crop, x0, y0, scale = _line_crop(image, words["bbox"][indices])
+        new = ocr(crop)
+        keep = word_mask(new, 0.0)
+        if not keep.any() or _mean_confidence(new, np.flatnonzero(keep)) < _mean_confidence(words, indices) + min_gain:
+            continue
+
+        bbox = np.rint(new["bbox"][keep] / scale).astype(np.int32)
+        bbox[:, 0] += x0
+        bbox[:, 1] += y0
+        count = int(keep.sum())
+        first = indices[0]
+        additions.append({
+            "block_num": np.full(count, words["block_num"][first], dtype=np.int32),
+            "par_num": np.full(count, words["par_num"][first], dtype=np.int32),
+            "line_num": np.full(count, words["line_num"][first], dtype=np.int32),
+            "bbox": bbox,
+            "conf": new["conf"][keep],
+            "text": [text for text, kept in zip(new["text"], keep) if kept]
+        })
+        drop.append(indices)
+        info["lines_improved"] += 1
+
+    if additions:
+        retained = np.ones(len(words["text"]), dtype=bool)
+        retained[np.concatenate(drop)] = False
+        parts = [{
+            key: (words[key][retained] if key != "text" else [t for t, r in zip(words["text"], retained) if r])
+            for key in ("block_num", "par_num", "line_num", "bbox", "conf", "text")
+        }] + additions
+        merged = {key: np.concatenate([part[key] for part in parts]) for key in ("block_num", "par_num", "line_num", "conf")}
+        merged["bbox"] = np.concatenate([part["bbox"] for part in parts]).reshape(-1, 4)
+        merged["text"] = [text for part in parts for text in part["text"]]
+
+        # Restore reading order: by line, then left to right
+        order = np.lexsort((merged["bbox"][:, 0], merged["line_num"], merged["par_num"], merged["block_num"]))
+        words = {key: merged[key][order] for key in ("block_num", "par_num", "line_num", "bbox", "conf")}
+        words["text"] = [merged["text"][i] for i in order]
+
+    info["ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return words, info
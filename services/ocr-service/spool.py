@@ -0,0 +1,86 @@
+# spool.py
+import hashlib
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Tuple
+from utils import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class SpoolLimitExceeded(ValueError):
+    pass
+
+
+async def spool_stream(read: Callable[[int], Awaitable[bytes]], path: str,
+                       max_bytes: int = 0) -> Tuple[str, int]:
+    """Copy an async byte stream to ``path`` chunk by chunk, returning (sha256, size).
+
+    The file appears under its final name only once it is complete. Raises
+    SpoolLimitExceeded, leaving nothing behind, if the stream is larger than
+    ``max_bytes``.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp_path, "wb") as f:
+            while True:
+                chunk = await read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_bytes and size > max_bytes:
+                    raise SpoolLimitExceeded(f"File too large. Max size: {max_bytes} bytes")
+                digest.update(chunk)
+                await run_in_threadpool(f.write, chunk)
+        os.replace(tmp_path, path)
+    except BaseException:
+        remove_spooled(tmp_path)
+        raise
+    return digest.hexdigest(), size
+
+
+def spool_bytes(content: bytes, path: str) -> str:
+    """Write in-memory content to ``path``, returning its sha256"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        remove_spooled(tmp_path)
+        raise
+    return hashlib.sha256(content).hexdigest()
+
+
+def remove_spooled(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Failed to remove spooled file {path}: {str(e)}")
+
+
+def sweep_spool(spool_dir: str, max_age_seconds: float) -> int:
+    """Delete spooled files older than ``max_age_seconds`` left by jobs that never ran"""
+    if not os.path.isdir(spool_dir):
+        return 0
+    cutoff = time.time() - max_age_seconds
+    removed = 0
+    for entry in os.scandir(spool_dir):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            continue
+    if removed:
+        logger.info(f"Removed {removed} expired spooled files from {spool_dir}")
+    return removed
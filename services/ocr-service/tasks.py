@@ -1,19 +1,120 @@
+import asyncio
+import time
 from ocr_processor import OCRProcessor
 from config import settings
+from spool import remove_spooled
+from lanes import count_pages
+from progress import JobProgress
+from rq import get_current_job
 
-processor = OCRProcessor(settings()) # type: ignore
+processor = OCRProcessor(settings)
 
-def run_ocr_job(file_content, filename, language="eng", file_id=None, confidence_threshold=30.0):
-    import asyncio
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    result = loop.run_until_complete(
-        processor.process_file(
-            file_content=file_content,
-            filename=filename,
-            language=language,
-            file_id=file_id, # type: ignore
-            confidence_threshold=confidence_threshold
+# One event loop per worker process, reused by every job it runs
+_loop = None
+
+def _run_async(coro):
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_loop)
+    return _loop.run_until_complete(coro)
+
+def _final_attempt() -> bool:
+    """Whether a failure of the current job is final, i.e. RQ will not retry it.
+
+    Spooled payloads are kept for a retry; otherwise they expire with the spool.
+    """
+    job = get_current_job()
+    return job is None or not job.retries_left
+
+def run_ocr_job(file_path, filename, language="eng", file_id=None, confidence_threshold=30.0,
+                preprocessing=None, dpi_mode=None, min_dpi=None, max_dpi=None,
+                pages=None, regions=None, region_units="pixels", file_hash=None, spooled=True):
+    """OCR a file referenced by path; spooled files are deleted once the job succeeds or finally fails.
+
+    Jobs queued before uploads were spooled carry the file's bytes in place
+    of the path; those are processed from memory.
+    """
+    file_content = None
+    if isinstance(file_path, (bytes, bytearray)):
+        file_content, file_path, spooled = file_path, None, False
+    try:
+        progress = JobProgress(
+            get_current_job(),
+            count_pages(file_path, filename.lower().split('.')[-1], pages) if file_path else None,
+            alpha=settings.progress_ema_alpha,
+            keep_partial=settings.progress_partial_results,
+            partial_ttl=settings.progress_partial_ttl
         )
-    )
+        result = _run_async(
+            processor.process_file(
+                file_content=file_content,
+                file_path=file_path,
+                file_hash=file_hash,
+                filename=filename,
+                language=language,
+                file_id=file_id, # type: ignore
+                confidence_threshold=confidence_threshold,
+                preprocessing=preprocessing,
+                dpi_mode=dpi_mode,
+                min_dpi=min_dpi,
+                max_dpi=max_dpi,
+                pages=pages,
+                regions=regions,
+                region_units=region_units,
+                on_page=lambda page: progress.step({
+                    "page": page["page"],
+                    "text": page["text"],
+                    "confidence": page["confidence"]
+                })
+            )
+        )
+    except Exception:
+        if spooled and _final_attempt():
+            remove_spooled(file_path)
+        raise
+    if spooled:
+        remove_spooled(file_path)
     return result.model_dump()
+
+def run_ocr_batch_job(documents, language="eng", confidence_threshold=30.0, preprocessing=None,
+                      dpi_mode=None, min_dpi=None, max_dpi=None, compact=False,
+                      pages=None, regions=None, region_units="pixels"):
+    progress = JobProgress(get_current_job(), len(documents), unit="files", alpha=settings.progress_ema_alpha)
+
+    async def collect():
+        start_time = time.time()
+        files = []
+        async for outcome in processor.iter_batch(
+            documents,
+            language=language,
+            confidence_threshold=confidence_threshold,
+            preprocessing=preprocessing,
+            dpi_mode=dpi_mode,
+            min_dpi=min_dpi,
+            max_dpi=max_dpi,
+            compact=compact,
+            pages=pages,
+            regions=regions,
+            region_units=region_units
+        ):
+            if "result" in outcome:
+                outcome["result"] = outcome["result"].model_dump()
+            files.append(outcome)
+            progress.step()
+        files.sort(key=lambda outcome: outcome["index"])
+        return {"files": files, "processing_time": round(time.time() - start_time, 2)}
+
+    try:
+        result = _run_async(collect())
+    except Exception:
+        if _final_attempt():
+            _remove_spooled_documents(documents)
+        raise
+    _remove_spooled_documents(documents)
+    return result
+
+def _remove_spooled_documents(documents):
+    for document in documents:
+        if document.get("spooled"):
+            remove_spooled(document["path"])
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Service modules import each other as top-level modules, and the shared
+# package from the repository root
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [SERVICE_DIR, os.path.dirname(os.path.dirname(SERVICE_DIR))]
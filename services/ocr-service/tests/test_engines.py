@@ -0,0 +1,20 @@
+import types
+import numpy as np # type: ignore
+import engines
+
+
+def test_failed_tesserocr_language_goes_straight_to_pytesseract(monkeypatch):
+    attempts = []
+
+    def failing_api(**kwargs):
+        attempts.append(kwargs["lang"])
+        raise RuntimeError("Failed to init API, possibly an invalid tessdata path")
+
+    monkeypatch.setattr(engines, "tesserocr", types.SimpleNamespace(PyTessBaseAPI=failing_api))
+    monkeypatch.setattr(engines, "_engines", {"auto": engines.TesserocrEngine()})
+    monkeypatch.setattr(engines.PytesseractEngine, "image_to_tsv", lambda self, image, language, psm=None: "tsv")
+
+    page = np.full((10, 10), 255, dtype=np.uint8)
+    for _ in range(3):
+        assert engines.image_to_tsv(page, "xyz") == "tsv"
+    assert attempts == ["xyz"]
@@ -0,0 +1,39 @@
+from collections import Counter
+from lanes import SmoothWeightedRoundRobin
+
+WEIGHTS = {"interactive": 6, "standard": 3, "bulk": 1}
+
+
+def serve_busy(scheduler, jobs):
+    """Serve ``jobs`` dequeues with every lane busy; returns lanes in serving order"""
+    served = []
+    for _ in range(jobs):
+        lane = scheduler.order()[0]
+        scheduler.served(lane)
+        served.append(lane)
+    return served
+
+
+def test_busy_lanes_are_served_in_proportion_to_weights():
+    served = Counter(serve_busy(SmoothWeightedRoundRobin(WEIGHTS), 1000))
+    for lane, weight in WEIGHTS.items():
+        assert abs(served[lane] - 100 * weight) <= 5
+
+
+def test_lane_served_alone_is_not_starved_when_others_return():
+    scheduler = SmoothWeightedRoundRobin(WEIGHTS)
+    # Only bulk has work for a long while
+    for _ in range(1000):
+        scheduler.served("bulk")
+    served = serve_busy(scheduler, 100)
+    assert "bulk" in served[:2 * scheduler.total]
+    assert 5 <= served.count("bulk") <= 15
+
+
+def test_idle_lane_does_not_build_up_a_burst():
+    scheduler = SmoothWeightedRoundRobin(WEIGHTS)
+    for _ in range(1000):
+        scheduler.served("interactive")
+    served = serve_busy(scheduler, 20)
+    assert served[:3].count("bulk") <= 1
+    assert served.count("bulk") <= 3
@@ -0,0 +1,66 @@
+import cv2 # type: ignore
+import numpy as np # type: ignore
+import pytest
+from page_filters import PageFilter, is_blank, page_signature, same_page
+
+# A4 at 150 DPI
+PAGE = (1240, 1754)
+MAX_DISTANCE = 6
+MAX_DIFF = 0.005
+
+
+def render(lines, shift=(0, 0), noise=0.0, seed=0):
+    page = np.full((PAGE[1], PAGE[0]), 245, dtype=np.uint8)
+    for i, line in enumerate(lines):
+        cv2.putText(page, line, (120 + shift[0], 200 + 60 * i + shift[1]),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.0, 20, 2, cv2.LINE_AA)
+    if noise:
+        jitter = np.random.default_rng(seed).normal(0, noise, page.shape)
+        page = np.clip(page + jitter, 0, 255).astype(np.uint8)
+    return page
+
+
+def matches(a, b):
+    return same_page(page_signature(a), page_signature(b), MAX_DISTANCE, MAX_DIFF)
+
+
+def invoice(number, customer, item, quantity, price):
+    lines = [f"Invoice {number}", f"Bill to: {customer}", "12 High Street", "Springfield",
+             "Date: 2024-03-01", "Terms: 30 days", ""]
+    lines += [f"{item} {quantity} {price:.2f}", "Shipping 1 5.00", "Handling 1 2.50", ""]
+    total = quantity * price + 7.5
+    lines += [f"Subtotal {total:.2f}", f"Tax {total * 0.2:.2f}", f"Total {total * 1.2:.2f}",
+              "Thank you for your business", "Page 1 of 1"]
+    return lines
+
+
+@pytest.mark.parametrize("a, b", [
+    (["Invoice 10023", "Bill to: Foo Ltd", "Widget 3 10.00", "Total 30.00"],
+     ["Invoice 10024", "Bar Inc", "Gadget 7 99.00", "Total 693.00"]),
+    (["Invoice 10023", "Bill to: Foo Ltd", "Widget 3 10.00", "Total 30.00"],
+     ["Invoice 10023", "Bill to: Foo Ltd", "Widget 3 10.00", "Total 31.00"]),
+    (invoice(10023, "Foo Ltd", "Widget", 3, 10.0), invoice(10024, "Bar Inc", "Widget", 7, 99.0)),
+    (invoice(10023, "Foo Ltd", "Widget", 3, 10.0), invoice(10023, "Foo Ltd", "Widget", 3, 12.0)),
+])
+def test_different_sparse_pages_do_not_match(a, b):
+    assert not matches(render(a), render(b))
+
+
+def test_same_page_matches_through_scan_noise_and_shift():
+    lines = invoice(10023, "Foo Ltd", "Widget", 3, 10.0)
+    assert matches(render(lines, noise=4.0, seed=1), render(lines, shift=(3, -2), noise=4.0, seed=2))
+
+
+def test_page_filter_reuses_duplicates_only():
+    page_filter = PageFilter([], 0.0003, 2.0, MAX_DISTANCE, MAX_DIFF)
+    first = invoice(10023, "Foo Ltd", "Widget", 3, 10.0)
+    assert page_filter.check(render(first), 1) == (None, None)
+    assert page_filter.check(render(invoice(10024, "Bar Inc", "Widget", 7, 99.0)), 2) == (None, None)
+    assert page_filter.check(render(first, noise=4.0), 3) == ("duplicate", 1)
+    assert page_filter.check(np.full((PAGE[1], PAGE[0]), 245, dtype=np.uint8), 4) == ("blank", None)
+
+
+def test_blank_page_with_specks_is_blank():
+    page = render([], noise=2.0)
+    page[400:402, 300:302] = 0
+    assert is_blank(page_signature(page), 0.0003, 2.0)
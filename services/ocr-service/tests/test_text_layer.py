@@ -0,0 +1,50 @@
+import fitz  # PyMuPDF
+import numpy as np # type: ignore
+import pytest
+from text_layer import extract_page_words
+
+BODY = "The quick brown fox jumps over the lazy dog near the river bank"
+
+
+def scan_pixmap(width, height):
+    """Gray noise standing in for a scanned page image"""
+    samples = np.random.default_rng(0).integers(150, 255, (height, width), dtype=np.uint8)
+    return fitz.Pixmap(fitz.csGRAY, width, height, samples.tobytes(), False)
+
+
+@pytest.fixture
+def doc():
+    document = fitz.open()
+    yield document
+    document.close()
+
+
+def test_born_digital_page_uses_text_layer(doc):
+    page = doc.new_page()
+    for row in range(20):
+        page.insert_text((72, 72 + 24 * row), BODY)
+    words = extract_page_words(doc, 1, 300)
+    assert words is not None and len(words) == 20 * len(BODY.split())
+
+
+def test_scan_with_digital_header_is_ocrd(doc):
+    page = doc.new_page()
+    page.insert_image(page.rect, pixmap=scan_pixmap(612, 792))
+    page.insert_text((72, 30), "Page 1 of 12 - Confidential")
+    page.insert_text((72, 780), "ACME-000123 Produced under protective order")
+    assert extract_page_words(doc, 1, 300) is None
+
+
+def test_header_and_footer_alone_are_not_the_page_body(doc):
+    page = doc.new_page()
+    page.insert_text((72, 30), "Page 1 of 12 - Confidential")
+    page.insert_text((72, 780), "ACME-000123 Produced under protective order")
+    assert extract_page_words(doc, 1, 300) is None
+
+
+def test_small_logo_does_not_force_ocr(doc):
+    page = doc.new_page()
+    page.insert_image(fitz.Rect(72, 20, 172, 60), pixmap=scan_pixmap(100, 40))
+    for row in range(20):
+        page.insert_text((72, 100 + 24 * row), BODY)
+    assert extract_page_words(doc, 1, 300) is not None
@@ -0,0 +1,27 @@
+import fakeredis
+from rq import Queue
+from lanes import LANES, SmoothWeightedRoundRobin
+from worker import WeightedFairWorker, listen
+
+
+def make_worker():
+    conn = fakeredis.FakeRedis()
+    worker = WeightedFairWorker([Queue(name, connection=conn) for name in listen], connection=conn)
+    worker.lane_scheduler = SmoothWeightedRoundRobin({"interactive": 6, "standard": 3, "bulk": 1})
+    return worker
+
+
+def test_maintenance_and_teardown_leave_rq_scheduler_alone():
+    worker = make_worker()
+    worker.register_birth()
+    worker.run_maintenance_tasks()
+    worker.teardown()
+
+
+def test_reorder_queues_follows_lane_scheduler():
+    worker = make_worker()
+    queues = {queue.name: queue for queue in worker.queues}
+    worker.reorder_queues(queues["interactive"])
+    order = [queue.name for queue in worker._ordered_queues]
+    assert order[:len(LANES)] == worker.lane_scheduler.order()
+    assert order[-1] == "default"
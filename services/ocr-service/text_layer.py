@@ -0,0 +1,103 @@
+# text_layer.py
+import logging
+from typing import Optional, Tuple
+import numpy as np # type: ignore
+from columnar import WordColumns
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+logger = logging.getLogger(__name__)
+
+
+def open_document(pdf_path: str):
+    """Open a PDF for text-layer extraction, or None if PyMuPDF is unavailable"""
+    if fitz is None:
+        return None
+    try:
+        return fitz.open(pdf_path)
+    except Exception as e:
+        logger.warning(f"Could not open PDF text layer: {str(e)}")
+        return None
+
+
+def _valid_ratio(text: str) -> float:
+    """Share of characters that look like real text rather than broken font mappings"""
+    if not text:
+        return 0.0
+    valid = sum(1 for ch in text if ch.isprintable() and ch != "\ufffd")
+    return valid / len(text)
+
+
+def page_size(doc, page_num: int, dpi: int) -> Tuple[int, int]:
+    """Page width and height in pixels at ``dpi``"""
+    rect = doc.load_page(page_num - 1).rect
+    return int(round(rect.width * dpi / 72.0)), int(round(rect.height * dpi / 72.0))
+
+
+def image_coverage(page) -> float:
+    """Share of the page's area covered by images (a scanned page is close to 1)"""
+    rect = page.rect
+    area = 0.0
+    for info in page.get_image_info():
+        bbox = fitz.Rect(info["bbox"]) & rect
+        if not bbox.is_empty:
+            area += bbox.width * bbox.height
+    return min(1.0, area / (rect.width * rect.height)) if rect.width and rect.height else 0.0
+
+
+def line_coverage(words, page_height: float) -> float:
+    """Share of the page's height covered by the text's lines"""
+    if not words or page_height <= 0:
+        return 0.0
+    covered = 0.0
+    end = None
+    for y0, y1 in sorted((word[1], word[3]) for word in words):
+        if end is None or y0 > end:
+            covered += y1 - y0
+            end = y1
+        elif y1 > end:
+            covered += y1 - end
+            end = y1
+    return min(1.0, covered / page_height)
+
+
+def extract_page_words(doc, page_num: int, dpi: int, min_words: int = 5,
+                       min_valid_ratio: float = 0.9, max_image_coverage: float = 0.5,
+                       min_line_coverage: float = 0.05) -> Optional[WordColumns]:
+    """Return words from a page's embedded text, or None if the page needs OCR.
+
+    A page needs OCR if its text is too short or garbled, if it is mostly an
+    image (a scan with a digital header, footer or Bates stamp), or if its
+    text lines cover too little of the page to be its body. Bounding boxes
+    are scaled from PDF points to pixels at ``dpi`` so they line up with
+    boxes from OCR'd pages of the same document.
+    """
+    page = doc.load_page(page_num - 1)
+    words = page.get_text("words")
+    if len(words) < min_words:
+        return None
+
+    if _valid_ratio("".join(word[4] for word in words)) < min_valid_ratio:
+        return None
+
+    if image_coverage(page) > max_image_coverage:
+        return None
+
+    if line_coverage(words, page.rect.height) < min_line_coverage:
+        return None
+
+    words = [word for word in words if word[4].strip()]
+    texts = [word[4].strip() for word in words]
+    boxes = np.array([word[:4] for word in words], dtype=np.float64).reshape(-1, 4)
+
+    # (x0, y0, x1, y1) in points -> [x, y, width, height] in pixels
+    boxes[:, 2:] -= boxes[:, :2]
+    boxes = np.rint(boxes * (dpi / 72.0))
+
+    # PyMuPDF numbers blocks and lines from 0 and has no paragraphs; match Tesseract's 1-based ids
+    lines = np.array([[word[5] + 1, 1, word[6] + 1] for word in words], dtype=np.int32).reshape(-1, 3)
+
+    return WordColumns.for_page(texts, np.full(len(texts), 100.0), boxes, page_num, lines)
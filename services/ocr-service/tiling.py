@@ -0,0 +1,53 @@
+# tiling.py
+from typing import List, Tuple
+import numpy as np # type: ignore
+from columnar import WordColumns
+
+
+def strip_bounds(height: int, strip_height: int, overlap: int) -> List[Tuple[int, int, int, int]]:
+    """Split an image's rows into overlapping strips.
+
+    Returns (top, bottom, own_top, own_bottom) per strip. Neighbouring strips
+    share ``overlap`` rows and each one owns the rows up to the middle of the
+    overlap, so every point of the image is owned by exactly one strip.
+    """
+    overlap = max(0, min(overlap, strip_height // 2))
+    step = strip_height - overlap
+    tops = list(range(0, max(height - overlap, 1), step))
+    strips = []
+    for i, top in enumerate(tops):
+        bottom = min(top + strip_height, height)
+        own_top = 0 if i == 0 else top + overlap // 2
+        own_bottom = height if i == len(tops) - 1 else tops[i + 1] + overlap // 2
+        strips.append((top, bottom, own_top, own_bottom))
+    return strips
+
+
+def merge_strips(parts: List[Tuple[WordColumns, int, int, int]]) -> WordColumns:
+    """Merge words OCR'd per strip into page coordinates.
+
+    ``parts`` holds (words, top, own_top, own_bottom) for each strip. Boxes
+    are shifted down by the strip's top; a word is kept only by the strip
+    that owns its centre, which drops the duplicates read twice in overlaps.
+    Block numbers are offset so blocks from different strips stay distinct.
+    """
+    merged = []
+    block_offset = 0
+    for words, top, own_top, own_bottom in parts:
+        if not len(words):
+            continue
+        words.bbox[:, 1] += top
+        centre = words.bbox[:, 1] + words.bbox[:, 3] / 2.0
+        words = words.select((centre >= own_top) & (centre < own_bottom))
+        if len(words):
+            words.line[:, 0] += block_offset
+            block_offset = int(words.line[:, 0].max())
+            merged.append(words)
+    return WordColumns.concat(merged)
+
+
+def scale_boxes(words: WordColumns, scale: float) -> WordColumns:
+    """Scale word boxes in place, e.g. from render resolution to the reference DPI"""
+    if scale != 1.0 and len(words):
+        words.bbox = np.rint(words.bbox * scale).astype(np.int32)
+    return words
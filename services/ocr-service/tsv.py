@@ -0,0 +1,75 @@
+# tsv.py
+from typing import Dict, List
+import numpy as np # type: ignore
+
+# Number of columns in a Tesseract TSV row
+TSV_COLUMNS = 12
+# TSV level of word rows; page/block/paragraph/line rows carry no text
+WORD_LEVEL = "5\t"
+
+
+def _column(cells: list, index: int, dtype) -> np.ndarray:
+    return np.array(cells[index::TSV_COLUMNS], dtype=dtype)
+
+
+def parse_tsv(tsv: str) -> Dict:
+    """Parse Tesseract TSV output into column arrays, one entry per word.
+
+    The rows are split in one pass over the whole string and each numeric
+    column is converted by NumPy, instead of casting every field of every box
+    in Python.
+    """
+    rows = [row for row in tsv.split("\n") if row.startswith(WORD_LEVEL)]
+    cells = "\t".join(rows).split("\t") if rows else []
+    if len(cells) != len(rows) * TSV_COLUMNS:
+        # A word containing a stray tab would shift every later column
+        rows = [row for row in rows if row.count("\t") == TSV_COLUMNS - 1]
+        cells = "\t".join(rows).split("\t") if rows else []
+
+    bbox = np.empty((len(rows), 4), dtype=np.int32)
+    for i, index in enumerate(range(6, 10)):
+        bbox[:, i] = _column(cells, index, np.int32)
+
+    return {
+        "block_num": _column(cells, 2, np.int32),
+        "par_num": _column(cells, 3, np.int32),
+        "line_num": _column(cells, 4, np.int32),
+        "bbox": bbox,
+        "conf": _column(cells, 10, np.float32),
+        "text": [text.strip() for text in cells[TSV_COLUMNS - 1::TSV_COLUMNS]]
+    }
+
+
+def word_mask(words: Dict, confidence_threshold: float) -> np.ndarray:
+    """Words that pass the confidence threshold and have non-empty text"""
+    has_text = np.fromiter(map(len, words["text"]), dtype=np.int32, count=len(words["text"])) > 0
+    return (words["conf"] >= confidence_threshold) & has_text
+
+
+def confidence_stats(words: Dict, mask: np.ndarray) -> Dict:
+    """Page-level confidence summary over every recognised word, kept or not"""
+    conf = words["conf"][word_mask(words, 0.0)]
+    stats = {"words_detected": int(conf.size), "words_kept": int(mask.sum())}
+    if conf.size:
+        low, median = np.percentile(conf, [10, 50])
+        stats["confidence_median"] = round(float(median), 2)
+        stats["confidence_p10"] = round(float(low), 2)
+    return stats
+
+
+def concat_words(parts: List[Dict]) -> Dict:
+    """Join parsed TSV output from several OCR calls on one page.
+
+    Block numbers are offset so blocks from different calls stay distinct.
+    """
+    if len(parts) == 1:
+        return parts[0]
+    offset = 0
+    for part in parts:
+        if part["block_num"].size:
+            part["block_num"] = part["block_num"] + offset
+            offset = int(part["block_num"].max())
+    words = {key: np.concatenate([part[key] for part in parts]) for key in ("block_num", "par_num", "line_num", "conf")}
+    words["bbox"] = np.concatenate([part["bbox"] for part in parts]).reshape(-1, 4)
+    words["text"] = [text for part in parts for text in part["text"]]
+    return words
@@ -1,9 +1,47 @@
 # --- utils.py ---
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+import multiprocessing
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 _executor = ThreadPoolExecutor()
+_process_executor = None
+
+def get_process_pool(max_workers: int = 0, initializer=None, initargs=()) -> ProcessPoolExecutor:
+    """Return the shared process pool, creating it on first use.
+
+    Workers are started by a forkserver rather than forked from this process,
+    whose other threads (the event loop's thread pool) could hold locks that a
+    forked child would inherit locked.
+    """
+    global _process_executor
+    if _process_executor is None:
+        _process_executor = ProcessPoolExecutor(
+            max_workers=max_workers or os.cpu_count() or 1,
+            mp_context=multiprocessing.get_context("forkserver"),
+            initializer=initializer,
+            initargs=initargs
+        )
+    return _process_executor
+
+def shutdown_pools():
+    """Shut down the shared executors"""
+    global _process_executor
+    if _process_executor is not None:
+        _process_executor.shutdown(wait=False, cancel_futures=True)
+        _process_executor = None
 
 async def run_in_threadpool(func, *args):
     loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(_executor, lambda: func(*args))
\ No newline at end of file
+    return await loop.run_in_executor(_executor, lambda: func(*args))
+
+async def run_in_processpool(func, *args, max_workers: int = 0, initializer=None, initargs=()):
+    loop = asyncio.get_event_loop()
+    pool = get_process_pool(max_workers, initializer, initargs)
+    try:
+        return await loop.run_in_executor(pool, func, *args)
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM-killed); drop the pool so the next call starts a fresh one
+        shutdown_pools()
+        raise
@@ -1,17 +1,128 @@
 import os
+import signal
+import time
+import logging
+import multiprocessing
 from redis import Redis
-from rq import Worker, Queue
+from rq import Queue, SimpleWorker
 
-# Define queues to listen to
-listen = ['default']
+# Each prefork process runs OCR inline; concurrency comes from the number of processes
+os.environ.setdefault("OCR_EXECUTION_MODE", "inline")
+
+from config import settings
+import tasks  # loaded before forking so every process shares the imported libraries
+from lanes import LANES, SmoothWeightedRoundRobin
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("ocr-worker")
+
+# Define queues to listen to: the lanes, plus the default queue for jobs enqueued before lanes existed
+listen = LANES + ['default']
 
 # Redis connection URL (default to redis://redis:6379)
 redis_url = os.getenv('REDIS_URL', 'redis://redis:6379')
 
-# Create Redis connection
-conn = Redis.from_url(redis_url)
+
+def current_rss_mb() -> float:
+    """Resident memory of this process in MB"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class WarmWorker(SimpleWorker):
+    """Runs jobs in its own process so the loaded OCR engine and models are reused.
+
+    After a job that leaves the process above ``max_rss_mb`` it stops, and the
+    supervisor replaces it with a fresh process.
+    """
+    max_rss_mb = 0
+
+    def execute_job(self, job, queue):
+        result = super().execute_job(job, queue)
+        rss = current_rss_mb()
+        if self.max_rss_mb and rss > self.max_rss_mb:
+            self.log.info(f"Worker RSS {rss:.0f} MB is over {self.max_rss_mb} MB, restarting")
+            self._stop_requested = True
+        return result
+
+
+class WeightedFairWorker(WarmWorker):
+    """Dequeues across lanes in proportion to their weights.
+
+    RQ tries queues in ``_ordered_queues`` order and takes the first job it
+    finds. After each dequeue the lanes are reordered by smooth weighted round
+    robin, so under load every lane gets its share and an empty lane is
+    simply skipped. (Not ``scheduler``: RQ keeps its own RQScheduler there.)
+    """
+    lane_scheduler = None
+
+    def reorder_queues(self, reference_queue):
+        if self.lane_scheduler is None:
+            return super().reorder_queues(reference_queue)
+        self.lane_scheduler.served(reference_queue.name)
+        rank = {name: i for i, name in enumerate(self.lane_scheduler.order())}
+        self._ordered_queues = sorted(self.queues, key=lambda q: rank.get(q.name, len(rank)))
+
+
+def run_worker():
+    """Body of one prefork process: warm up, then consume jobs until recycled"""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    timings = tasks.processor.warm_up(settings.worker_warm_languages)
+    logger.info(f"Worker {os.getpid()} warmed up: {timings}")
+
+    conn = Redis.from_url(redis_url)
+    worker = WeightedFairWorker([Queue(name, connection=conn) for name in listen], connection=conn)
+    worker.max_rss_mb = settings.worker_max_rss_mb
+    worker.lane_scheduler = SmoothWeightedRoundRobin({
+        lane: settings.queue_lane_weights.get(lane, 1) for lane in LANES
+    })
+    worker.work(max_jobs=settings.worker_max_jobs or None)
+
+
+def supervise(processes: int):
+    """Keep ``processes`` warm workers running, replacing any that exit"""
+    context = multiprocessing.get_context("fork")
+    children = {}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for child in children.values():
+            if child.is_alive():
+                os.kill(child.pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while True:
+        for slot in range(processes):
+            child = children.get(slot)
+            if child is not None and child.is_alive():
+                continue
+            if child is not None:
+                child.join()
+                logger.info(f"Worker {child.pid} exited with code {child.exitcode}")
+                if child.exitcode:
+                    # Don't spin if workers are crashing on start (e.g. Redis is down)
+                    time.sleep(1)
+            if stopping:
+                children.pop(slot, None)
+                continue
+            child = context.Process(target=run_worker, name=f"ocr-worker-{slot}")
+            child.start()
+            children[slot] = child
+
+        if stopping and not children:
+            break
+        time.sleep(0.5)
+
 
 if __name__ == '__main__':
-    # Create worker and start processing jobs
-    worker = Worker([Queue(name, connection=conn) for name in listen])
-    worker.work()
+    supervise(settings.worker_processes or os.cpu_count() or 1)
@@ -102,6 +102,7 @@ class TextBlock(BaseModel):
     confidence: float
     bbox: List[int]  # [x, y, width, height]
     page: int
+    line: Optional[List[int]] = None  # [block, paragraph, line] within the page
 
 class OCRResult(BaseModel):
     file_id: Optional[str]
@@ -114,6 +115,45 @@ class OCRResult(BaseModel):
     metadata: Dict
     timestamp: str
 
+class CompactTextBlocks(BaseModel):
+    """Word-level OCR output as parallel arrays (index i across all fields is one word)"""
+    text: List[str]
+    confidence: List[float]
+    bbox: List[List[int]]  # [x, y, width, height] per word
+    page: List[int]
+    line: Optional[List[List[int]]] = None  # [block, paragraph, line] per word
+
+class CompactOCRResult(BaseModel):
+    file_id: Optional[str]
+    processing_time: float
+    total_pages: int
+    language: str
+    overall_confidence: float
+    words: CompactTextBlocks
+    full_text: str
+    metadata: Dict
+    timestamp: str
+
+class FormField(BaseModel):
+    value: str
+    confidence: float
+    box: List[int]  # [x, y, width, height] of the field on the page
+
+class FormPage(BaseModel):
+    page: int
+    alignment: Dict
+    fields: Dict[str, FormField]
+
+class FormResult(BaseModel):
+    file_id: Optional[str]
+    template: str
+    processing_time: float
+    total_pages: int
+    language: str
+    fields: Dict[str, str]  # field name -> value, from the first page where it is filled
+    pages: List[FormPage]
+    timestamp: str
+
 class HealthResponse(BaseModel):
     status: str
     tesseract_version: str